@@ -12,12 +12,29 @@ a = Analysis(
         'psutil',
         'requests',
         'google.genai',
-        'dotenv'
+        'dotenv',
+        'network_sender',  # Imported lazily by main.py
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Not used by the app: smaller archive, less to unpack on every start
+    excludes=[
+        'tkinter',
+        '_tkinter',
+        'unittest',
+        'pydoc',
+        'doctest',
+        'lib2to3',
+        'xmlrpc',
+        'curses',
+        'setuptools',
+        'pip',
+        'IPython',
+        'matplotlib',
+        'numpy',
+        'pandas',
+    ],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -37,7 +54,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,  # UPX-packed DLLs are decompressed on every launch, which slows the cold start
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,  # No console window
@@ -0,0 +1,174 @@
+import argparse
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+import wire_format
+
+
+class Agent:
+    """
+    Headless agent: runs quickcheck() in a loop and streams the reports to a
+    collector over one persistent TCP connection, in the compact binary format
+    from wire_format (delta-encoded against the previous report).
+    """
+
+    def __init__(self, host, port, interval=5.0, speed_every=60, keyframe_interval=60):
+        self.address = (host, port)
+        self.interval = interval
+        self.speed_every = speed_every  # Run the speed test on every N-th report only
+        self.encoder = wire_format.ReportEncoder(keyframe_interval=keyframe_interval)
+        self.sock = None
+        self.count = 0
+        self.last_speed = None
+        self.stop_event = threading.Event()
+
+    def connect(self):
+        self.sock = socket.create_connection(self.address, timeout=10)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.encoder.reset()  # New connection: the collector needs a keyframe
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def collect(self):
+        import monitor_sys  # Imported here so the collector mode does not need psutil
+
+        include_speed = self.speed_every > 0 and self.count % self.speed_every == 0
+        report = monitor_sys.quickcheck(include_speed=include_speed)
+        network = report['Network']
+        if include_speed:
+            self.last_speed = network.get('Speed')
+        elif self.last_speed is not None and network.get('Public_IP') not in ('Unknown', 'API Error'):
+            # Repeat the last measurement, so it costs nothing in the delta
+            network['Speed'] = self.last_speed
+        self.count += 1
+        return report
+
+    def send(self, report):
+        for attempt in range(2):
+            try:
+                if self.sock is None:
+                    self.connect()  # Resets the encoder, so this frame is a keyframe
+                frame = self.encoder.encode(report)
+                self.sock.sendall(frame)
+                return len(frame)
+            except OSError as e:
+                print(f"Agent: collector unavailable ({e})")
+                self.close()
+        return 0
+
+    def run(self):
+        backoff = 1
+        while not self.stop_event.is_set():
+            start = time.monotonic()
+            sent = self.send(self.collect())
+            if sent:
+                backoff = 1
+                wait = self.interval - (time.monotonic() - start)
+            else:
+                # Collector down: retry later with growing pauses (max 1 minute)
+                backoff = min(backoff * 2, 60)
+                wait = max(self.interval, backoff)
+            self.stop_event.wait(max(0.0, wait))
+        self.close()
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+class CollectorHandler(socketserver.StreamRequestHandler):
+    """
+    One agent connection: decode frames until the agent disconnects.
+    """
+
+    def handle(self):
+        decoder = wire_format.ReportDecoder()
+        while True:
+            try:
+                payload = wire_format.read_frame(self.rfile)
+                if payload is None:
+                    break
+                report = decoder.decode(payload)
+            except wire_format.WireError as e:
+                print(f"Collector: bad frame from {self.client_address[0]}: {e}")
+                break
+            self.server.store(report, len(payload) + wire_format.LENGTH.size)
+
+
+class Collector(socketserver.ThreadingTCPServer):
+    """
+    Local collector stand-in: keeps the latest report of every host
+    and counts received frames/bytes.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, verbose=False):
+        super().__init__(address, CollectorHandler)
+        self.verbose = verbose
+        self.latest = {}  # Hostname -> report
+        self.frames = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def store(self, report, size):
+        with self.lock:
+            self.latest[report.get('Hostname', 'Unknown')] = report
+            self.frames += 1
+            self.bytes += size
+        if self.verbose:
+            print(f"[{report['Time']}] {report.get('Hostname')}: {size} bytes, "
+                  f"RAM {report.get('RAM', {}).get('Percent')}%, Disk {report.get('Disk', {}).get('Percent')}%")
+
+
+def start_collector(host="127.0.0.1", port=0, verbose=False):
+    """
+    Start a collector in a background thread. Returns the server.
+    """
+    server = Collector((host, port), verbose=verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HealthCheck agent and local collector")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    run = sub.add_parser("run", help="stream reports of this machine to a collector")
+    run.add_argument('--collector', default="127.0.0.1:9200", help="collector HOST:PORT (default: 127.0.0.1:9200)")
+    run.add_argument('--interval', type=float, default=5.0, help="seconds between reports (default: 5)")
+    run.add_argument('--speed-every', type=int, default=60,
+                     help="run the speed test on every N-th report, 0 = never (default: 60)")
+
+    collect = sub.add_parser("collector", help="run a local collector that prints incoming reports")
+    collect.add_argument('--host', default="127.0.0.1")
+    collect.add_argument('--port', type=int, default=9200)
+    args = parser.parse_args()
+
+    if args.mode == "run":
+        host, _, port = args.collector.rpartition(":")
+        agent = Agent(host, int(port), interval=args.interval, speed_every=args.speed_every)
+        signal.signal(signal.SIGINT, agent.stop)
+        signal.signal(signal.SIGTERM, agent.stop)
+        agent.run()
+    else:
+        server = Collector((args.host, args.port), verbose=True)
+        print(f"Collector listening on {args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import bisect
+import json
+import math
+import os
+import threading
+
+import tsdb
+
+# Where the engine state (active alerts and baselines) is kept between runs.
+# Every process that evaluates alerts needs its own file: the daemon keeps its engine
+# in memory and would overwrite (and be confused by) the state of manual GUI checks.
+STATE_FILE = os.path.join(tsdb.DATA_DIR, "alerts.json")
+GUI_STATE_FILE = os.path.join(tsdb.DATA_DIR, "alerts_gui.json")
+
+# Static limits: field -> (alert name, raise at or above, clear below). The gap keeps the state from flapping.
+THRESHOLDS = {
+    'Disk_Percent': ('Disk', 90, 85),
+    'RAM_Percent': ('RAM', 90, 80),
+}
+# Flags: field -> alert name, raised when the value is 0/False
+FLAGS = {
+    'Network_Status': 'Network',
+    'Gateway_Status': 'Gateway',
+}
+# Rolling baselines: field -> (alert name, bad direction, quantile, ratio to the average that is always normal)
+BASELINES = {
+    'Ping': ('Ping', 'high', 0.95, 1.5),
+    'Speed_Mbps': ('Speed', 'low', 0.05, 0.5),
+}
+UNITS = {'Ping': 'ms', 'Speed_Mbps': 'Mbps'}
+
+EWMA_ALPHA = 0.1  # Weight of the newest sample in the moving average
+DEVIATIONS = 3    # How many standard deviations from the average count as an anomaly
+WARMUP = 10       # Samples a baseline needs before it can raise alerts
+
+
+class Ewma:
+    """
+    Exponentially weighted moving average and variance (constant memory).
+    """
+
+    def __init__(self, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self.mean = None
+        self.var = 0.0
+
+    def add(self, x):
+        if self.mean is None:
+            self.mean = x
+            return
+        diff = x - self.mean
+        incr = self.alpha * diff
+        self.mean += incr
+        self.var = (1 - self.alpha) * (self.var + diff * incr)
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate with the P² algorithm (Jain & Chlamtac, 1985):
+    five markers instead of the full sample list, so memory never grows.
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []  # Marker heights (the first five samples, sorted, until the markers start)
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+        self.count = 0
+
+    def add(self, x):
+        self.count += 1
+        q, n = self.heights, self.positions
+        if self.count <= 5:
+            bisect.insort(q, x)
+            return
+
+        # 1. Find the cell of x (and stretch the outer markers)
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # 2. Move the middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])  # Linear fallback
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    @property
+    def value(self):
+        if not self.heights:
+            return None
+        if self.count <= 5:
+            return self.heights[min(len(self.heights) - 1, int(self.p * len(self.heights)))]
+        return self.heights[2]
+
+
+class Baseline:
+    """
+    Normal range of one measurement: EWMA average/deviation plus a P² percentile.
+    A value is an anomaly only if it is beyond all three: DEVIATIONS standard
+    deviations, the percentile, and the fixed ratio to the average (so a very
+    stable ping does not alert on +2 ms).
+    """
+
+    def __init__(self, direction, quantile, ratio):
+        self.direction = direction
+        self.ratio = ratio
+        self.ewma = Ewma()
+        self.quantile = P2Quantile(quantile)
+
+    @property
+    def count(self):
+        return self.quantile.count
+
+    def is_anomaly(self, x):
+        if self.count < WARMUP:
+            return False
+        mean, std, limit = self.ewma.mean, self.ewma.std, self.quantile.value
+        if self.direction == 'high':
+            return x > mean + DEVIATIONS * std and x > limit and x > mean * self.ratio
+        return x < mean - DEVIATIONS * std and x < limit and x < mean * self.ratio
+
+    def add(self, x, anomaly=False):
+        if not anomaly:
+            self.ewma.add(x)
+            self.quantile.add(x)
+            return
+        # An outlier must not widen the normal range (one bad sample would hide the next ones):
+        # the average still moves, so a lasting change becomes the new normal after a while,
+        # but the deviation stays and the percentile only sees the value clipped to its limit.
+        self.ewma.mean += self.ewma.alpha * (x - self.ewma.mean)
+        self.quantile.add(self.quantile.value)
+
+    def to_dict(self):
+        return {'Mean': self.ewma.mean, 'Var': self.ewma.var, 'Heights': self.quantile.heights,
+                'Positions': self.quantile.positions, 'Desired': self.quantile.desired,
+                'Count': self.quantile.count}
+
+    def load(self, data):
+        self.ewma.mean = data['Mean']
+        self.ewma.var = data['Var']
+        self.quantile.heights = list(data['Heights'])
+        self.quantile.positions = list(data['Positions'])
+        self.quantile.desired = list(data['Desired'])
+        self.quantile.count = data['Count']
+
+
+def values_from_report(report):
+    """
+    Fields of a quickcheck() report the engine looks at (see tsdb.values_from_report).
+    """
+    values = tsdb.values_from_report(report)
+    status = (report.get('Network') or {}).get('Status')
+    values['Network_Status'] = status if isinstance(status, bool) else None
+    return values
+
+
+class AlertEngine:
+    """
+    Local verdict on a report: static thresholds plus anomaly detection against
+    rolling baselines. check() returns only state changes, so notifications
+    (Telegram, Gemini) go out when an alert is raised or cleared, not on every check.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {}  # Alert name -> message
+        self.baselines = {field: Baseline(*rule[1:]) for field, rule in BASELINES.items()}
+
+    def _evaluate(self, field, value):
+        """
+        (alert name, message or None if ok) for one value. Caller holds the lock.
+        """
+        if field in THRESHOLDS:
+            name, limit, clear = THRESHOLDS[field]
+            # Between 'clear' and 'limit' the alert keeps its current state
+            if value >= limit or (name in self.active and value >= clear):
+                return name, f"{name} {value:g}% (limit {limit}%)"
+            return name, None
+        if field in FLAGS:
+            name = FLAGS[field]
+            return name, None if value else f"{name} down"
+
+        name = BASELINES[field][0]
+        baseline = self.baselines[field]
+        message = None
+        anomaly = baseline.is_anomaly(value)
+        if anomaly:
+            message = (f"{name} {value:.1f} {UNITS[field]} (normal {baseline.ewma.mean:.1f}, "
+                       f"p{round(baseline.quantile.p * 100)} {baseline.quantile.value:.1f})")
+        baseline.add(value, anomaly)
+        return name, message
+
+    def check(self, values):
+        """
+        Evaluate the given values (dict field -> number, see values_from_report).
+        Missing fields (None) keep their alert state.
+        Returns {'Raised': {name: message}, 'Cleared': [names]} or None if nothing changed.
+        """
+        raised, cleared = {}, []
+        with self.lock:
+            for field, value in values.items():
+                if value is None or not (field in THRESHOLDS or field in FLAGS or field in BASELINES):
+                    continue
+                name, message = self._evaluate(field, value)
+                if message and name not in self.active:
+                    raised[name] = message
+                elif message is None and name in self.active:
+                    cleared.append(name)
+                if message:
+                    self.active[name] = message
+                else:
+                    self.active.pop(name, None)
+        if not raised and not cleared:
+            return None
+        return {'Raised': raised, 'Cleared': cleared}
+
+    def summary(self, transition=None):
+        """
+        The 'Alerts' section of a report: active alerts and what just changed.
+        """
+        with self.lock:
+            section = {'Active': dict(self.active)}
+        if transition:
+            section.update(transition)
+        return section
+
+    def save(self, path=None):
+        path = path or STATE_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # The lock covers the write too: daemon threads (metrics, speed, network) save
+        # concurrently, and they share the temporary file name
+        with self.lock:
+            state = {'Active': self.active,
+                     'Baselines': {field: b.to_dict() for field, b in self.baselines.items()}}
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Engine with the state saved by save(); a fresh engine if there is none.
+        """
+        engine = cls()
+        try:
+            with open(path or STATE_FILE, encoding="utf-8") as f:
+                state = json.load(f)
+            engine.active = dict(state.get('Active', {}))
+            for field, data in state.get('Baselines', {}).items():
+                if field in engine.baselines:
+                    engine.baselines[field].load(data)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return engine
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+
+import psutil
+import standins
+
+FAKE_TOKEN = "123456:BENCH"
+FAKE_CHAT_ID = "1"
+
+
+def peak_rss_mb():
+    """
+    Highest resident memory of this process so far, in MB.
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+    except ImportError:
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+
+
+def percentile(sorted_values, pct):
+    pos = (len(sorted_values) - 1) * pct / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def bench(func, iterations, setup=None):
+    """
+    Call func() 'iterations' times and return its latency distribution in ms.
+    setup() runs before every call and is not timed (e.g. to clear caches).
+    Exceptions count as errors, and so do the failure values of the senders
+    (False from send_to_telegram, the "Gemini Error" text of ask_gemini).
+    """
+    samples = []
+    errors = 0
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        try:
+            result = func()
+            if result is False or (isinstance(result, str) and result.startswith("Gemini Error")):
+                errors += 1
+        except Exception:
+            errors += 1
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'Iterations': iterations,
+        'Errors': errors,
+        'Min_ms': round(samples[0], 3),
+        'P50_ms': round(percentile(samples, 50), 3),
+        'P90_ms': round(percentile(samples, 90), 3),
+        'Max_ms': round(samples[-1], 3),
+        'Mean_ms': round(statistics.mean(samples), 3),
+        'Peak_RSS_MB': peak_rss_mb(),
+    }
+
+
+def point_at_standins(url):
+    """
+    Redirect every external endpoint to the local stand-in server.
+    Must run before network_sender is imported (it reads the environment at import).
+    """
+    import connectivity
+    import monitor_sys
+    port = urllib.parse.urlparse(url).port
+    # Connectivity matrix: the stand-in is the only "anycast host" (TCP and DNS), localhost the
+    # name to resolve. It speaks no TLS, so the matrix reports Failed_Layer 'https' but is online.
+    connectivity.TARGETS = {'IPv4': ('127.0.0.1',), 'IPv6': ()}
+    connectivity.TCP_PORT = port
+    connectivity.DNS_PORT = port
+    connectivity.HTTPS_HOST = "localhost"
+    connectivity.HTTPS_PORT = port
+    monitor_sys.PUBLIC_DATA_URL = f"{url}/json/"
+    monitor_sys.SPEED_URL = url + "/__down?bytes={bytes}"
+    monitor_sys.SPEED_BACKUP_URL = f"{url}/10MB.zip"
+    monitor_sys.PING_HOST = "127.0.0.1"
+
+    os.environ["TELEGRAM_API_URL"] = url
+    os.environ["GEMINI_BASE_URL"] = url
+    os.environ.setdefault("TELEGRAM_TOKEN", FAKE_TOKEN)
+    os.environ.setdefault("TELEGRAM_CHAT_ID", FAKE_CHAT_ID)
+    os.environ.setdefault("GEMINI_API_KEY", "bench-key")
+
+
+def telegram_burst(network_sender, report, count):
+    """
+    'count' reports at the same time (many checks finishing together); returns when all are delivered.
+    """
+    threads = [threading.Thread(target=network_sender.send_to_telegram, args=(f"Burst {i}", report))
+               for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_benchmarks(iterations, rate_mbps, latency, telegram_rate=0):
+    server = standins.start(rate_mbps=rate_mbps, latency=latency, telegram_rate=telegram_rate)
+    url = standins.base_url(server)
+    point_at_standins(url)
+
+    import monitor_sys
+
+    def clear_cache():
+        monitor_sys.facts_cache.clear()
+        monitor_sys.interfaces.inventory.invalidate()
+
+    probes = {
+        'get_public_data': (monitor_sys.get_public_data, clear_cache),
+        'get_gateway': (monitor_sys.get_gateway, clear_cache),
+        'find_real_interface_offline': (monitor_sys.find_real_interface_offline, clear_cache),
+        'check_speed': (monitor_sys.check_speed, None),
+        'quickcheck_cold': (monitor_sys.quickcheck, clear_cache),
+        'quickcheck_warm': (monitor_sys.quickcheck, None),
+    }
+
+    # Telegram/Gemini need the optional SDKs; skip them if they are not installed
+    try:
+        import network_sender
+        sample_report = monitor_sys.quickcheck()
+        try:
+            network_sender.get_gemini_client()  # The SDK is imported lazily, on first use
+            probes['ask_gemini'] = (lambda: network_sender.ask_gemini(sample_report), None)
+        except ImportError as e:
+            print(f"Skipping Gemini benchmark: {e}")
+        probes['send_to_telegram'] = (lambda: network_sender.send_to_telegram("Benchmark", sample_report), None)
+        probes['telegram_burst_10'] = (lambda: telegram_burst(network_sender, sample_report, 10), None)
+    except ImportError as e:
+        print(f"Skipping Telegram/Gemini benchmarks: {e}")
+
+    results = {}
+    for name, (func, setup) in probes.items():
+        print(f"Benchmarking {name}...", flush=True)
+        results[name] = bench(func, iterations, setup)
+
+    server.shutdown()
+    return {
+        'Time': datetime.now().isoformat(timespec='seconds'),
+        'Python': platform.python_version(),
+        'Platform': platform.platform(),
+        'Settings': {'Iterations': iterations, 'Rate_Mbps': rate_mbps, 'Latency_s': latency,
+                     'Telegram_Rate': telegram_rate},
+        'Stand_In_Requests': server.requests,
+        'Telegram_Delivery': network_sender.get_delivery().stats if 'send_to_telegram' in probes else None,
+        'Peak_RSS_MB': peak_rss_mb(),
+        'Probes': results,
+    }
+
+
+def compare(old, new):
+    """
+    Print P50 latency of every probe in two result files side by side.
+    """
+    print(f"{'Probe':<30}{'Old P50 ms':>12}{'New P50 ms':>12}{'Change':>10}")
+    for name, stats in new['Probes'].items():
+        before = old.get('Probes', {}).get(name)
+        if not before:
+            print(f"{name:<30}{'-':>12}{stats['P50_ms']:>12}{'new':>10}")
+            continue
+        change = (stats['P50_ms'] - before['P50_ms']) / before['P50_ms'] * 100 if before['P50_ms'] else 0
+        print(f"{name:<30}{before['P50_ms']:>12}{stats['P50_ms']:>12}{change:>+9.1f}%")
+    print(f"{'Peak RSS MB':<30}{old.get('Peak_RSS_MB', '-'):>12}{new['Peak_RSS_MB']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HealthCheck probes against local stand-in servers")
+    parser.add_argument('--iterations', type=int, default=5, help="runs per probe (default: 5)")
+    parser.add_argument('--rate-mbps', type=float, default=100,
+                        help="bandwidth of every fake download connection, 0 = unlimited (default: 100)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="extra delay in seconds for every stand-in answer (default: 0)")
+    parser.add_argument('--telegram-rate', type=float, default=0,
+                        help="Bot API requests per second before the fake Telegram answers 429, 0 = unlimited")
+    parser.add_argument('--output', default="bench_results.json", help="where to write results (JSON)")
+    parser.add_argument('--compare', metavar="OLD_JSON", help="compare with results of a previous run")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.rate_mbps, args.latency, args.telegram_rate)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+    else:
+        for name, stats in results['Probes'].items():
+            print(f"{name:<30} p50={stats['P50_ms']:>10} ms  p90={stats['P90_ms']:>10} ms  errors={stats['Errors']}")
+
+
+if __name__ == "__main__":
+    main()
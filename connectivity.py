@@ -0,0 +1,251 @@
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+
+import latency
+
+# Public anycast DNS resolvers (Cloudflare, Google, Quad9). Each is tested twice:
+# TCP handshake on 443 (is the host reachable?) and a DNS query on UDP 53 (does it resolve?).
+TARGETS = {
+    'IPv4': ('1.1.1.1', '8.8.8.8', '9.9.9.9'),
+    'IPv6': ('2606:4700:4700::1111', '2001:4860:4860::8888', '2620:fe::fe'),
+}
+FAMILIES = {'IPv4': socket.AF_INET, 'IPv6': socket.AF_INET6}
+TCP_PORT = 443
+DNS_PORT = 53
+
+# Name resolved with the system resolver and then used for the TLS handshake
+HTTPS_HOST = "www.google.com"
+HTTPS_PORT = 443
+# All of the above are module attributes so tests and the benchmark can point them at a stand-in
+
+PROBE_TIMEOUT = 1.0  # One RTT timeout: every single probe gives up after this
+ROUND_TIMEOUT = 1.5  # The whole matrix (resolve + TCP + TLS chain included) never takes longer
+
+# Layers from the bottom up; a path is reported with the first one that fails
+LAYERS = ('link', 'gateway', 'internet', 'dns', 'https')
+
+
+def _result(ms=None, error=None):
+    if error is not None:
+        return {'Ok': False, 'Error': error}
+    return {'Ok': True, 'Ms': round(ms, 1)}
+
+
+def _has_route(family, target):
+    """
+    UDP connect sends no packets, it only asks the kernel for a route.
+    """
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        sock.connect((target, DNS_PORT))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def _tcp(family, address):
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(PROBE_TIMEOUT)
+    start = time.perf_counter()
+    try:
+        sock.connect((address, TCP_PORT))
+    except ConnectionRefusedError:
+        pass  # RST came back - the host is reachable
+    except OSError as e:
+        return _result(error=type(e).__name__)
+    finally:
+        sock.close()
+    return _result((time.perf_counter() - start) * 1000)
+
+
+def _dns_query(name, qtype):
+    """
+    Minimal DNS query packet (one question, recursion desired). Returns (id, packet).
+    """
+    ident = int.from_bytes(os.urandom(2), "big")
+    header = struct.pack("!HHHHHH", ident, 0x0100, 1, 0, 0, 0)
+    question = b"".join(bytes([len(label)]) + label.encode("ascii") for label in name.split(".")) + b"\x00"
+    return ident, header + question + struct.pack("!HH", qtype, 1)
+
+
+def _dns(family, server):
+    """
+    Ask one resolver directly (bypasses the system resolver).
+    """
+    ident, packet = _dns_query(HTTPS_HOST, 1 if family == socket.AF_INET else 28)  # A / AAAA
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.settimeout(PROBE_TIMEOUT)
+    start = time.perf_counter()
+    try:
+        sock.sendto(packet, (server, DNS_PORT))
+        while True:
+            data = sock.recv(512)
+            if len(data) >= 12 and struct.unpack("!H", data[:2])[0] == ident:
+                break  # Ignore stray answers to someone else's query
+        rcode = data[3] & 0x0F
+        if not data[2] & 0x80 or rcode != 0:
+            return _result(error=f"RCODE{rcode}")
+    except OSError as e:
+        return _result(error=type(e).__name__)
+    finally:
+        sock.close()
+    return _result((time.perf_counter() - start) * 1000)
+
+
+def _system_dns():
+    """
+    System resolver (what every application uses). Returns (result, {family name: address}).
+    """
+    start = time.perf_counter()
+    try:
+        infos = socket.getaddrinfo(HTTPS_HOST, HTTPS_PORT, proto=socket.IPPROTO_TCP)
+    except OSError as e:
+        return _result(error=type(e).__name__), {}
+    addresses = {}
+    for family, _, _, _, sockaddr in infos:
+        for name, value in FAMILIES.items():
+            if family == value:
+                addresses.setdefault(name, sockaddr[0])
+    return _result((time.perf_counter() - start) * 1000), addresses
+
+
+def _https(family, address):
+    """
+    TCP connect plus a verified TLS handshake. A failure here with working TCP
+    usually means a captive portal or TLS interception.
+    """
+    context = ssl.create_default_context()
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(PROBE_TIMEOUT)
+    start = time.perf_counter()
+    try:
+        sock.connect((address, HTTPS_PORT))
+        connected = time.perf_counter()
+        with context.wrap_socket(sock, server_hostname=HTTPS_HOST):
+            pass
+        done = time.perf_counter()
+    except (OSError, ssl.SSLError) as e:
+        sock.close()
+        return dict(_result(error=type(e).__name__), Target=address)
+    return dict(_result((done - start) * 1000), Target=address,
+                Handshake_ms=round((done - connected) * 1000, 1))
+
+
+def _gateway(address):
+    stats = latency.probe_latency(address, count=1, timeout=PROBE_TIMEOUT)
+    if stats['Avg'] is None:
+        return dict(_result(error='NoReply'), Target=address)
+    return dict(_result(stats['Avg']), Target=address)
+
+
+def _failed_layer(path, dns):
+    """
+    First layer that fails on one path (IPv4 or IPv6), None if everything works.
+    """
+    if not path.get('Route'):
+        return 'link'
+    targets = path['Targets'].values()
+    reachable = any(t['TCP']['Ok'] or t['DNS']['Ok'] for t in targets)
+    if not reachable:
+        gateway = path.get('Gateway')
+        return 'gateway' if gateway is not None and not gateway['Ok'] else 'internet'
+    if not dns['Ok']:
+        return 'dns'  # Compare the public resolvers in 'Targets': blocked port 53 or only the local resolver
+    https = path.get('HTTPS')
+    if https is not None and not https['Ok']:
+        return 'https'
+    return None
+
+
+def check(gateways=None, timeout=ROUND_TIMEOUT):
+    """
+    Connectivity matrix: gateway, public anycast hosts (TCP 443 and DNS), system DNS
+    and an HTTPS handshake, for IPv4 and IPv6 separately. Everything runs at the
+    same time in one round of at most 'timeout' seconds; probes that have not
+    answered by then count as failed ('Timeout').
+    gateways - optional function returning {'IPv4': address, 'IPv6': address}
+    (it is called inside the round, so a slow lookup does not add to it).
+    Returns dict: Status (True if any path reaches the internet), Failed_Layer
+    (of the best path, None if one path works completely), DNS, IPv4, IPv6, Duration_ms.
+    """
+    start = time.perf_counter()
+    boxes = {}
+    threads = []
+
+    def spawn(key, func, *args):
+        def run():
+            boxes[key] = func(*args)
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    routes = {name: bool(TARGETS[name]) and _has_route(FAMILIES[name], TARGETS[name][0]) for name in TARGETS}
+    for name, targets in TARGETS.items():
+        if not routes[name]:
+            continue  # No address of this family - nothing to test
+        for target in targets:
+            spawn((name, target, 'TCP'), _tcp, FAMILIES[name], target)
+            spawn((name, target, 'DNS'), _dns, FAMILIES[name], target)
+
+    def resolve_and_connect():
+        result, addresses = _system_dns()
+        boxes['DNS'] = result
+        boxes['Addresses'] = addresses
+        for name, address in addresses.items():
+            if routes.get(name):
+                spawn((name, 'HTTPS'), _https, FAMILIES[name], address)
+
+    def find_gateways():
+        try:
+            found = gateways() or {}
+        except Exception:
+            found = {}
+        for name, address in found.items():
+            if address and routes.get(name):
+                spawn((name, 'Gateway'), _gateway, address)
+
+    spawn('resolve', resolve_and_connect)
+    if gateways is not None:
+        spawn('gateways', find_gateways)
+
+    deadline = time.monotonic() + timeout
+    # Threads started later (HTTPS, gateway) are appended while we wait
+    i = 0
+    while i < len(threads):
+        threads[i].join(max(0.0, deadline - time.monotonic()))
+        i += 1
+
+    timed_out = _result(error='Timeout')
+    dns = boxes.get('DNS', timed_out)
+    report = {'Status': False, 'Failed_Layer': None, 'DNS': dns}
+    layers = []
+    for name, targets in TARGETS.items():
+        path = {'Route': routes[name]}
+        if routes[name]:
+            path['Targets'] = {
+                target: {'TCP': boxes.get((name, target, 'TCP'), timed_out),
+                         'DNS': boxes.get((name, target, 'DNS'), timed_out)}
+                for target in targets
+            }
+            if (name, 'Gateway') in boxes:
+                path['Gateway'] = boxes[(name, 'Gateway')]
+            address = boxes.get('Addresses', {}).get(name)
+            if address:  # No HTTPS test if the name has no address of this family
+                path['HTTPS'] = boxes.get((name, 'HTTPS'), dict(timed_out, Target=address))
+        path['Failed_Layer'] = _failed_layer(path, dns)
+        if path['Failed_Layer'] not in ('link', 'gateway', 'internet'):
+            report['Status'] = True
+        layers.append(path['Failed_Layer'])
+        report[name] = path
+
+    # The best path decides: None if one works completely, otherwise the highest layer reached
+    if None not in layers:
+        report['Failed_Layer'] = max(layers, key=LAYERS.index)
+    report['Duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return report
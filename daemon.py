@@ -0,0 +1,338 @@
+import argparse
+import math
+import signal
+import threading
+import time
+from array import array
+
+import psutil
+import monitor_sys
+import net_metrics
+import tsdb
+import outbox
+import alerts
+
+
+class RingBuffer:
+    """
+    Fixed-size history of numeric samples.
+    Every field is stored in its own preallocated array('d'), so memory is
+    allocated once and never grows, no matter how long the daemon runs.
+    Missing values are stored as NaN and returned as None.
+    """
+
+    def __init__(self, fields, capacity):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.columns = {name: array('d', bytes(8 * capacity)) for name in self.fields}
+        self.next = 0  # Index of the slot that will be written next
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, values, timestamp=None):
+        """
+        Store one sample (dict field -> number), overwriting the oldest one when full.
+        """
+        with self.lock:
+            i = self.next
+            self.times[i] = time.time() if timestamp is None else timestamp
+            for name in self.fields:
+                value = values.get(name)
+                self.columns[name][i] = math.nan if value is None else float(value)
+            self.next = (i + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def _row(self, i):
+        row = {'Time': self.times[i]}
+        for name in self.fields:
+            value = self.columns[name][i]
+            row[name] = None if math.isnan(value) else value
+        return row
+
+    def latest(self):
+        """
+        Newest sample as dict, or None if empty.
+        """
+        with self.lock:
+            if not self.count:
+                return None
+            return self._row((self.next - 1) % self.capacity)
+
+    def last(self, n=None):
+        """
+        Up to n newest samples (all if n is None), oldest first.
+        """
+        with self.lock:
+            n = self.count if n is None else min(n, self.count)
+            start = (self.next - n) % self.capacity
+            return [self._row((start + k) % self.capacity) for k in range(n)]
+
+
+class Scheduler:
+    """
+    Runs jobs at fixed intervals.
+    Slow jobs can run in background threads so they never delay the fast ones;
+    a background job is not started again while its previous run is still going.
+    """
+
+    def __init__(self):
+        self.jobs = []
+
+    def add(self, name, interval, func, background=False, run_now=True):
+        first = time.monotonic() if run_now else time.monotonic() + interval
+        self.jobs.append({'name': name, 'interval': interval, 'func': func,
+                          'background': background, 'next': first, 'thread': None})
+
+    def _run(self, job):
+        try:
+            job['func']()
+        except Exception as e:
+            print(f"Daemon job '{job['name']}' failed: {e}")
+
+    def run_pending(self):
+        now = time.monotonic()
+        for job in self.jobs:
+            if now < job['next']:
+                continue
+            # Keep the original rhythm; skip missed runs instead of bursting
+            job['next'] += job['interval'] * max(1, math.ceil((now - job['next']) / job['interval']))
+            if job['background']:
+                if job['thread'] is not None and job['thread'].is_alive():
+                    continue
+                job['thread'] = threading.Thread(target=self._run, args=(job,), daemon=True)
+                job['thread'].start()
+            else:
+                self._run(job)
+
+    def run_forever(self, stop_event):
+        while not stop_event.is_set():
+            self.run_pending()
+            next_run = min(job['next'] for job in self.jobs)
+            stop_event.wait(max(0.0, next_run - time.monotonic()))
+
+
+class HealthDaemon:
+    """
+    Headless monitoring: cheap metrics every second, expensive probes
+    (speed test, public IP) on their own slower schedules.
+    Every sample goes through the alert engine; with notify=True only its
+    state changes are sent to Telegram (with a Gemini analysis).
+    """
+
+    METRICS = ('CPU_Percent', 'RAM_Percent', 'Disk_Percent', 'Net_Sent_Bps', 'Net_Recv_Bps',
+               'Net_Errors_Sec', 'Net_Drops_Sec')
+    SPEED_METRICS = ('Ping', 'Speed_Mbps')
+
+    def __init__(self, sample_interval=1.0, speed_interval=900, public_interval=600,
+                 history=86400, speed_history=1000, store=None, outbox_interval=60, exporter=None,
+                 network_interval=30, notify=False):
+        self.sample_interval = sample_interval
+        self.speed_interval = speed_interval
+        self.public_interval = public_interval
+        self.outbox_interval = outbox_interval
+        self.network_interval = network_interval
+        self.disk_path = monitor_sys.get_disk_path()
+
+        self.history = RingBuffer(self.METRICS, history)
+        self.speed_history = RingBuffer(self.SPEED_METRICS, speed_history)
+        self.public_data = None
+        self.network_values = {}  # Latest check_network() result (Network_Status, Gateway_Status)
+        self.store = store  # Optional tsdb.TimeSeriesStore for long-term history
+        self.exporter = exporter  # Optional exporter.MetricsServer, refreshed after every sample
+        self.boot_time = monitor_sys.get_boot_time()
+        self.alerts = alerts.AlertEngine.load()
+        self.notify = notify
+
+        self.net_rates = net_metrics.InterfaceRates()
+        self.stop_event = threading.Event()
+        self.scheduler = Scheduler()
+
+        psutil.cpu_percent(interval=None)  # First call only primes the counter
+
+    def sample_metrics(self):
+        """
+        Cheap metrics from psutil, no network traffic.
+        """
+        rates = self.net_rates.sample()
+        net = net_metrics.totals(rates) if rates else {}
+
+        self.history.append({
+            'CPU_Percent': psutil.cpu_percent(interval=None),
+            'RAM_Percent': psutil.virtual_memory().percent,
+            'Disk_Percent': psutil.disk_usage(self.disk_path).percent,
+            'Net_Sent_Bps': net.get('Bytes_Sent_Sec'),
+            'Net_Recv_Bps': net.get('Bytes_Recv_Sec'),
+            'Net_Errors_Sec': net.get('Errors_In_Sec', 0) + net.get('Errors_Out_Sec', 0) if net else None,
+            'Net_Drops_Sec': net.get('Drops_In_Sec', 0) + net.get('Drops_Out_Sec', 0) if net else None,
+        })
+        if self.store is not None:
+            latest = self.history.latest()
+            self.store.append({'RAM_Percent': latest['RAM_Percent'], 'Disk_Percent': latest['Disk_Percent']},
+                              latest['Time'])
+        if self.exporter is not None:
+            self.exporter.update(self.metric_values())
+        latest = self.history.latest()
+        self.check_alerts({'RAM_Percent': latest['RAM_Percent'], 'Disk_Percent': latest['Disk_Percent']})
+
+    def run_speed(self):
+        speed = monitor_sys.check_speed()
+        # Errors are strings ("Error", "N/A") - store them as missing values
+        self.speed_history.append({
+            name: speed.get(name) if isinstance(speed.get(name), (int, float)) else None
+            for name in self.SPEED_METRICS
+        })
+        if self.store is not None:
+            self.store.append(self.speed_history.latest())
+        latest = self.speed_history.latest()
+        self.check_alerts({'Ping': latest['Ping'], 'Speed_Mbps': latest['Speed_Mbps']})
+        self.alerts.save()  # Keep the learned baselines across restarts
+
+    def check_network(self):
+        """
+        Connectivity matrix (online = some path works) and, when offline with a
+        DHCP address, the gateway (same rule as quickcheck).
+        """
+        network = monitor_sys.apply_connectivity(monitor_sys.get_network_status(),
+                                                 monitor_sys.check_connectivity())
+        values = {'Network_Status': network['Status'], 'Gateway_Status': 1.0 if network['Status'] else None}
+        if not network['Status'] and network['DHCP']:
+            values['Gateway_Status'] = 1.0 if monitor_sys.check_gateway()['Gateway_Status'] else 0.0
+        self.network_values = values
+        self.check_alerts(values)
+
+    def check_alerts(self, values):
+        """
+        Feed values to the alert engine; on a state change, log it and (with notify) report it.
+        """
+        transition = self.alerts.check(values)
+        if transition is None:
+            return
+        changes = list(transition['Raised'].values()) + [f"{name} ok" for name in transition['Cleared']]
+        print(f"[{time.strftime('%H:%M:%S')}] Alerts: {'; '.join(changes)}", flush=True)
+        self.alerts.save()
+        if self.notify:
+            threading.Thread(target=self.send_alert, args=(transition,), daemon=True).start()
+
+    def send_alert(self, transition):
+        try:
+            import network_sender  # Needs Telegram/Gemini keys, only loaded when there is something to report
+            report = monitor_sys.quickcheck(include_speed=False)
+            report['Alerts'] = self.alerts.summary(transition)
+            network_sender.send_alert(report)
+        except Exception as e:
+            print(f"Alert Error: {e}")
+
+    def run_public(self):
+        data = monitor_sys.get_public_data()
+        if data:
+            self.public_data = data
+
+    def drain_outbox(self):
+        """
+        Send reports queued while offline, once the network is back.
+        """
+        if not outbox.pending() or not monitor_sys.get_network_status()['Status']:
+            return
+        import network_sender  # Needs Telegram/Gemini keys, only loaded when there is work
+        sent = network_sender.drain_outbox()
+        if sent:
+            print(f"Outbox: sent {sent} queued report(s)")
+
+    def metric_values(self):
+        """
+        Latest values as exporter gauges (see exporter.GAUGES).
+        """
+        metrics = self.history.latest() or {}
+        speed = self.speed_history.latest() or {}
+        network = self.network_values
+        status = network.get('Network_Status')
+        return {
+            'healthcheck_up': 1,
+            'healthcheck_cpu_percent': metrics.get('CPU_Percent'),
+            'healthcheck_ram_percent': metrics.get('RAM_Percent'),
+            'healthcheck_disk_percent': metrics.get('Disk_Percent'),
+            'healthcheck_ping_ms': speed.get('Ping'),
+            'healthcheck_speed_mbps': speed.get('Speed_Mbps'),
+            'healthcheck_speed_timestamp_seconds': round(speed['Time']) if speed else None,
+            'healthcheck_uptime_seconds': round(time.time() - self.boot_time),
+            'healthcheck_network_up': None if status is None else int(status),
+            'healthcheck_gateway_up': None if network.get('Gateway_Status') is None else int(network['Gateway_Status']),
+        }
+
+    def snapshot(self):
+        """
+        Latest known values of everything the daemon measures.
+        """
+        return {
+            'Metrics': self.history.latest(),
+            'Speed': self.speed_history.latest(),
+            'Public': self.public_data,
+            'Alerts': self.alerts.summary()['Active'],
+        }
+
+    def setup(self):
+        self.scheduler.add('metrics', self.sample_interval, self.sample_metrics)
+        self.scheduler.add('public', self.public_interval, self.run_public, background=True)
+        self.scheduler.add('speed', self.speed_interval, self.run_speed, background=True)
+        self.scheduler.add('network', self.network_interval, self.check_network, background=True)
+        self.scheduler.add('outbox', self.outbox_interval, self.drain_outbox, background=True)
+
+    def run(self):
+        self.setup()
+        self.scheduler.run_forever(self.stop_event)
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HealthCheck headless daemon")
+    parser.add_argument('--sample-interval', type=float, default=1.0,
+                        help="seconds between cheap metric samples (default: 1)")
+    parser.add_argument('--speed-interval', type=float, default=900,
+                        help="seconds between speed tests (default: 900)")
+    parser.add_argument('--public-interval', type=float, default=600,
+                        help="seconds between public IP lookups (default: 600)")
+    parser.add_argument('--history', type=int, default=86400,
+                        help="number of metric samples kept in memory (default: 86400)")
+    parser.add_argument('--no-store', action='store_true',
+                        help="do not write long-term history to ~/.healthcheck/history")
+    parser.add_argument('--log-interval', type=float, default=60,
+                        help="seconds between status lines on stdout, 0 to disable (default: 60)")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="serve Prometheus metrics on this port, 0 to disable (default: 0)")
+    parser.add_argument('--metrics-host', default="0.0.0.0",
+                        help="address for the metrics endpoint (default: 0.0.0.0)")
+    parser.add_argument('--network-interval', type=float, default=30,
+                        help="seconds between network/gateway checks for alerts (default: 30)")
+    parser.add_argument('--notify', action='store_true',
+                        help="send alert state changes to Telegram with a Gemini analysis")
+    args = parser.parse_args()
+
+    metrics_server = None
+    if args.metrics_port:
+        import exporter
+        metrics_server = exporter.start_server(args.metrics_host, args.metrics_port)
+        print(f"Serving metrics on http://{args.metrics_host}:{args.metrics_port}/metrics")
+
+    daemon = HealthDaemon(sample_interval=args.sample_interval, speed_interval=args.speed_interval,
+                          public_interval=args.public_interval, history=args.history,
+                          store=None if args.no_store else tsdb.get_store(), exporter=metrics_server,
+                          network_interval=args.network_interval, notify=args.notify)
+
+    if args.log_interval > 0:
+        def log_status():
+            print(f"[{time.strftime('%H:%M:%S')}] {daemon.snapshot()}", flush=True)
+        daemon.scheduler.add('log', args.log_interval, log_status, run_now=False)
+
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import json
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# name -> help text. Every metric is a gauge; metrics without a value are left out.
+GAUGES = {
+    'healthcheck_up': "1 if the last health check finished",
+    'healthcheck_ram_percent': "RAM usage in percent",
+    'healthcheck_disk_percent': "Usage of the main disk in percent",
+    'healthcheck_cpu_percent': "CPU usage in percent (daemon only)",
+    'healthcheck_network_up': "1 if there is a route to the internet",
+    'healthcheck_gateway_up': "1 if the default gateway answers (or is not needed because we are online)",
+    'healthcheck_ping_ms': "Average latency to the ping host in milliseconds",
+    'healthcheck_speed_mbps': "Download speed of the last speed test in Mbit/s",
+    'healthcheck_speed_timestamp_seconds': "Unix time of the last speed test",
+    'healthcheck_uptime_seconds': "System uptime in seconds",
+    'healthcheck_probe_duration_seconds': "Duration of each probe of the last health check",
+    'healthcheck_snapshot_timestamp_seconds': "Unix time of the snapshot being served",
+}
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _number(value):
+    """
+    Numbers only: True/False become 1/0, 'Error' / 'N/A' / None mean no value.
+    """
+    if isinstance(value, bool):
+        return 1 if value else 0
+    if isinstance(value, (int, float)):
+        return value
+    return None
+
+
+def values_from_report(report, boot_time=None):
+    """
+    Gauge values of a quickcheck() report. Labelled metrics are dicts {label value: number}.
+    """
+    network = report.get('Network', {})
+    speed = network.get('Speed') or {}
+    gateway = network.get('Gateway_Status')
+    values = {
+        'healthcheck_up': 1,
+        'healthcheck_ram_percent': _number(report.get('RAM', {}).get('Percent')),
+        'healthcheck_disk_percent': _number(report.get('Disk', {}).get('Percent')),
+        'healthcheck_network_up': _number(network.get('Status')),
+        # 'No Need' = online, so the gateway obviously works
+        'healthcheck_gateway_up': 1 if gateway == 'No Need' else _number(gateway),
+        'healthcheck_ping_ms': _number(speed.get('Ping')),
+        'healthcheck_speed_mbps': _number(speed.get('Speed_Mbps')),
+    }
+    if boot_time is not None:
+        values['healthcheck_uptime_seconds'] = round(time.time() - boot_time)
+    timings = report.get('Timings', {}).get('Probes', {})
+    values['healthcheck_probe_duration_seconds'] = {
+        name: round(span['Duration_ms'] / 1000, 4) for name, span in timings.items() if span.get('Outcome') != 'skipped'
+    }
+    return values
+
+
+def _format(value):
+    return str(int(value)) if isinstance(value, int) else repr(float(value))
+
+
+def render(values, openmetrics=False):
+    """
+    Exposition text for the given values (Prometheus text format 0.0.4 or OpenMetrics 1.0).
+    """
+    lines = []
+    for name, help_text in GAUGES.items():
+        value = values.get(name)
+        if isinstance(value, dict):
+            samples = [(f'{name}{{probe="{label}"}}', v) for label, v in value.items() if _number(v) is not None]
+        else:
+            samples = [(name, value)] if _number(value) is not None else []
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}.")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{sample} {_format(v)}" for sample, v in samples)
+    if openmetrics:
+        lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Serves the pre-rendered snapshot. Nothing is measured during a scrape.
+    """
+
+    # Keep-alive for scrapers that reuse connections; headers and body leave in one segment
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/report" and self.server.report_body is not None:
+            # Latest full report as JSON (the 'agent' URL of fleet.py inventories)
+            self._send(self.server.report_body, "application/json")
+            return
+        if path != "/metrics":
+            self.send_error(404)
+            return
+        prometheus, openmetrics = self.server.body
+        if "application/openmetrics-text" in self.headers.get("Accept", ""):
+            body, content_type = openmetrics, OPENMETRICS_TYPE
+        else:
+            body, content_type = prometheus, PROMETHEUS_TYPE
+        self._send(body, content_type)
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the output
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """
+    HTTP server for /metrics (and /report). update() renders new values once; every scrape
+    just writes the ready bytes (swapping the tuple is atomic, no lock needed).
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, MetricsHandler)
+        self.body = (render({}), render({}, openmetrics=True))
+        self.report_body = None
+
+    def update(self, values, report=None):
+        """
+        values - dict metric name -> number (see GAUGES); report - optional full report for /report.
+        """
+        values = dict(values, healthcheck_snapshot_timestamp_seconds=round(time.time(), 3))
+        self.body = (render(values), render(values, openmetrics=True))
+        if report is not None:
+            self.report_body = json.dumps(report, ensure_ascii=False).encode("utf-8")
+
+
+def start_server(host="0.0.0.0", port=9108):
+    """
+    Start a metrics server in a background thread. Returns the server.
+    """
+    server = MetricsServer((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Refresher:
+    """
+    Standalone mode: runs quickcheck() in the background and feeds the server.
+    The speed test only runs every 'speed_interval' seconds; in between the last
+    result is served again.
+    """
+
+    def __init__(self, server, interval=30, speed_interval=900):
+        self.server = server
+        self.interval = interval
+        self.speed_interval = speed_interval
+        self.last_speed = None
+        self.last_speed_time = None
+        self.last_speed_unix = None
+        self.stop_event = threading.Event()
+
+    def refresh(self):
+        import monitor_sys  # Only needed in standalone mode, the daemon brings its own values
+
+        include_speed = self.speed_interval > 0 and (
+            self.last_speed_time is None or time.monotonic() - self.last_speed_time >= self.speed_interval)
+        report = monitor_sys.quickcheck(include_speed=include_speed)
+        network = report['Network']
+        if include_speed and network.get('Status'):
+            # The test ran (online): the next one waits speed_interval even if this one failed
+            self.last_speed_time = time.monotonic()
+        if include_speed and network.get('Speed'):
+            self.last_speed = network['Speed']
+            self.last_speed_unix = time.time()
+        elif self.last_speed is not None and network.get('Status'):
+            network['Speed'] = self.last_speed
+
+        values = values_from_report(report, boot_time=monitor_sys.get_boot_time())
+        if self.last_speed is not None:
+            values['healthcheck_speed_timestamp_seconds'] = round(self.last_speed_unix)
+        self.server.update(values, report)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            start = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Exporter refresh failed: {e}")
+                self.server.update({'healthcheck_up': 0})
+            self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - start)))
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prometheus/OpenMetrics exporter for HealthCheck")
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=9108)
+    parser.add_argument('--interval', type=float, default=30,
+                        help="seconds between health checks (default: 30)")
+    parser.add_argument('--speed-interval', type=float, default=900,
+                        help="seconds between speed tests, 0 = never (default: 900)")
+    args = parser.parse_args()
+
+    server = start_server(args.host, args.port)
+    refresher = Refresher(server, interval=args.interval, speed_interval=args.speed_interval)
+    signal.signal(signal.SIGINT, refresher.stop)
+    signal.signal(signal.SIGTERM, refresher.stop)
+    print(f"Serving metrics on http://{args.host}:{args.port}/metrics")
+    refresher.run()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import json
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import http_pool
+import latency
+
+
+def load_inventory(path):
+    """
+    Read the list of targets.
+    JSON file: list of {"host": ..., "ports": [...], "agent": "http://..."}.
+    Text file: one host per line, optional 'ports=22,443' and 'agent=URL', '#' comments:
+        10.0.0.5 ports=22,443 agent=http://10.0.0.5:9108/report
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            targets = json.load(f)
+        else:
+            targets = []
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                fields = line.split()
+                target = {'host': fields[0]}
+                for field in fields[1:]:
+                    key, _, value = field.partition("=")
+                    if key == "ports":
+                        target['ports'] = [int(p) for p in value.split(",") if p]
+                    elif key == "agent":
+                        target['agent'] = value
+                targets.append(target)
+    return targets
+
+
+def check_port(host, port, timeout):
+    """
+    TCP connect check. Returns 'open', 'closed' (refused) or 'filtered' (no answer).
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return 'open'
+    except ConnectionRefusedError:
+        return 'closed'
+    except OSError:
+        return 'filtered'
+
+
+def check_target(target, timeout):
+    """
+    All checks for one host: reachability, TCP ports and the agent report.
+    A host that cannot be checked at all (e.g. a malformed name) is reported
+    as unreachable instead of aborting the whole fleet run.
+    """
+    try:
+        return _check_target(target, timeout)
+    except Exception as e:
+        return {'Host': target.get('host'), 'Reachable': False, 'Ping': None, 'Error': type(e).__name__}
+
+
+def _check_target(target, timeout):
+    host = target['host']
+    result = {'Host': host}
+
+    # Like monitor_sys.ping_host(), but one echo instead of two (many hosts) and with latency numbers
+    stats = latency.probe_latency(host, count=1, timeout=timeout)
+    result['Reachable'] = stats['Received'] > 0
+    result['Ping'] = stats['Avg']
+
+    if target.get('ports'):
+        result['Ports'] = {str(port): check_port(host, port, timeout) for port in target['ports']}
+
+    if target.get('agent'):
+        try:
+            with http_pool.get(target['agent'], timeout=timeout * 3) as resp:
+                resp.raise_for_status()
+                result['Report'] = resp.json()
+        except Exception as e:
+            result['Report'] = None
+            result['Agent_Error'] = type(e).__name__
+    return result
+
+
+def slowest_probes(reports):
+    counts = {}
+    for report in reports:
+        timings = report.get('Timings')
+        name = timings.get('Slowest') if isinstance(timings, dict) else None
+        if name:
+            counts[name] = counts.get(name, 0) + 1
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+
+def aggregate(results, duration):
+    """
+    One fleet report from the per-host results.
+    """
+    reports = [r['Report'] for r in results if r.get('Report')]
+
+    def worst(section):
+        values = [r[section]['Percent'] for r in reports
+                  if isinstance(r.get(section), dict) and isinstance(r[section].get('Percent'), (int, float))]
+        return max(values) if values else None
+
+    return {
+        'Time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'Duration': round(duration, 2),
+        'Total': len(results),
+        'Reachable': sum(1 for r in results if r['Reachable']),
+        'Unreachable': [r['Host'] for r in results if not r['Reachable']],
+        'Closed_Ports': {r['Host']: [p for p, state in r['Ports'].items() if state != 'open']
+                         for r in results if r.get('Ports') and any(s != 'open' for s in r['Ports'].values())},
+        'Agents': {
+            'Reporting': len(reports),
+            'Failed': [r['Host'] for r in results if 'Agent_Error' in r],
+            'Max_Disk_Percent': worst('Disk'),
+            'Max_RAM_Percent': worst('RAM'),
+            # How often each probe was the slowest one (report['Timings'] of the agents)
+            'Slowest_Probes': slowest_probes(reports),
+        },
+        'Hosts': results,
+    }
+
+
+def run_fleet(targets, workers=256, timeout=1.0):
+    """
+    Check all targets concurrently with a bounded pool of worker threads.
+    """
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet") as executor:
+        results = list(executor.map(lambda t: check_target(t, timeout), targets))
+    return aggregate(results, time.monotonic() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check many hosts in parallel from one collector")
+    parser.add_argument('inventory', help="inventory file (.json or text, one host per line)")
+    parser.add_argument('--workers', type=int, default=256, help="parallel checks (default: 256)")
+    parser.add_argument('--timeout', type=float, default=1.0, help="per-probe timeout in seconds (default: 1)")
+    parser.add_argument('--output', default="fleet_report.json", help="where to write the aggregated report")
+    args = parser.parse_args()
+
+    targets = load_inventory(args.inventory)
+    # Agent reports come from many hosts at once - keep a connection per worker
+    http_pool.configure(pool_size=min(args.workers, 1000))
+    report = run_fleet(targets, workers=args.workers, timeout=args.timeout)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"{report['Reachable']}/{report['Total']} hosts reachable, "
+          f"{report['Agents']['Reporting']} agent reports, {report['Duration']} s")
+    print(f"Fleet report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import threading
+from urllib.parse import urlsplit
+
+# requests/urllib3 are imported in get_session(): they cost ~100 ms at startup
+# and most processes (GUI before the first scan, offline checks) never need them
+
+# Keep-alive connections kept per host (configurable for daemons with many parallel probes)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+# Timeout (seconds) used when the caller does not pass one
+DEFAULT_TIMEOUT = 10
+
+# Per-host timeouts (seconds)
+HOST_TIMEOUTS = {
+    'ip-api.com': 3,
+    'speed.cloudflare.com': 15,
+    'ipv4.download.thinkbroadband.com': 20,
+    'api.telegram.org': 15,
+}
+
+_session = None
+_lock = threading.Lock()
+
+
+def configure(pool_size=None, timeouts=None, default_timeout=None):
+    """
+    Change pool size and timeouts. Existing connections are closed.
+    timeouts - dict host -> seconds, merged into HOST_TIMEOUTS.
+    """
+    global POOL_SIZE, DEFAULT_TIMEOUT, _session
+    with _lock:
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+        if default_timeout is not None:
+            DEFAULT_TIMEOUT = default_timeout
+        if timeouts:
+            HOST_TIMEOUTS.update(timeouts)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """
+    Shared requests.Session with a keep-alive connection pool.
+    All outbound HTTP goes through it, so repeated reports reuse warm connections
+    (no new DNS lookup, TCP connect and TLS handshake each time).
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            import urllib3
+            from requests.adapters import HTTPAdapter
+
+            # The speed test skips certificate checks (broken SSL on some Macs), don't warn on every request
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def timeout_for(url):
+    return HOST_TIMEOUTS.get(urlsplit(url).hostname, DEFAULT_TIMEOUT)
+
+
+def request(method, url, **kwargs):
+    """
+    Same as requests.request(), but through the shared pool and with the per-host timeout.
+    """
+    kwargs.setdefault('timeout', timeout_for(url))
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
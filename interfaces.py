@@ -0,0 +1,165 @@
+import platform
+import re
+import socket
+import threading
+import time
+
+import psutil
+
+import routes
+
+# Interfaces that are never the "real" uplink (one precompiled pattern instead of a loop of substring checks).
+# Linux / Kubernetes kernel names only as prefixes (cali1a2b, vxlan.calico), so real names that merely
+# contain them are kept; 'lo' / 'lo0' only as whole names, so "Local Area Connection" is kept.
+JUNK_PATTERN = re.compile(
+    r"loopback|virtual|pseudo|tunnel|vmware|box|bluetooth|hyper-v|wsl"  # Windows junk
+    r"|utun|awdl|llw|gif|stf|ap1"  # Mac junk
+    r"|bridge|^(?:docker|veth|br-|cni|flannel|cali|vxlan|kube|tun|tap|virbr)"  # Linux / Kubernetes junk
+    r"|^lo\d*$",
+    re.IGNORECASE,
+)
+
+MAX_AGE = 60  # Seconds after which the inventory is rebuilt even if no interface came or went
+
+# Address rank of a candidate: lower is better
+RANK_IPV4 = 0
+RANK_IPV4_LINK_LOCAL = 1  # 169.254.x.x - no DHCP lease, still worth reporting
+RANK_IPV6 = 2
+
+
+def is_junk(name):
+    return JUNK_PATTERN.search(name) is not None
+
+
+def _interface_names():
+    """
+    Cheap fingerprint of the interface set (one if_nameindex call, no per-interface ioctls).
+    None if the platform does not support it - then only MAX_AGE triggers a rebuild.
+    """
+    try:
+        return frozenset(name for _, name in socket.if_nameindex())
+    except (AttributeError, OSError):
+        return None
+
+
+def _default_route_interfaces():
+    if platform.system() != "Linux":
+        return set()
+    try:
+        return {r['Interface'] for r in routes.default_routes()}
+    except Exception:
+        return set()
+
+
+def _best_address(addr_list):
+    """
+    (rank, address) of the best address of one interface, or None if it has no usable address.
+    """
+    best = None
+    for addr in addr_list:
+        if addr.family == socket.AF_INET:
+            if addr.address.startswith('127.'):
+                continue
+            rank = RANK_IPV4_LINK_LOCAL if addr.address.startswith('169.254.') else RANK_IPV4
+        elif addr.family == socket.AF_INET6:
+            address = addr.address.split('%', 1)[0]
+            # Loopback and link-local (fe80::/10) addresses do not reach the internet
+            if address == '::1' or address.lower().startswith('fe8'):
+                continue
+            rank = RANK_IPV6
+        else:
+            continue
+        if best is None or rank < best[0]:
+            best = (rank, addr.address.split('%', 1)[0])
+    return best
+
+
+class Inventory:
+    """
+    Snapshot of the network interfaces: IP -> interface index and the ranked list
+    of real (non-virtual, up) interfaces. Rebuilt only when the interface set
+    changes, after MAX_AGE seconds, or after invalidate() (network changed).
+    """
+
+    def __init__(self, max_age=MAX_AGE):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.names = None
+        self.built_at = None
+        self.by_ip = {}
+        self.candidates = []
+
+    def invalidate(self):
+        with self.lock:
+            self.built_at = None
+
+    def _refresh(self, force=False):
+        # Caller holds the lock
+        names = _interface_names()
+        fresh = (self.built_at is not None and names is not None and names == self.names
+                 and time.monotonic() - self.built_at < self.max_age)
+        if fresh and not force:
+            return
+
+        stats = psutil.net_if_stats()
+        addrs = psutil.net_if_addrs()
+        default_ifaces = _default_route_interfaces()
+
+        by_ip = {}
+        candidates = []
+        for name, addr_list in addrs.items():
+            for addr in addr_list:
+                if addr.family in (socket.AF_INET, socket.AF_INET6):
+                    by_ip.setdefault(addr.address.split('%', 1)[0], name)
+            stat = stats.get(name)
+            if stat is None or not stat.isup or is_junk(name):
+                continue
+            best = _best_address(addr_list)
+            if best is None:
+                continue
+            rank, address = best
+            # Default route first, then IPv4 before IPv6, then the fastest link (speed 0 = unknown)
+            key = (name not in default_ifaces, rank, -stat.speed, name)
+            candidates.append((key, {'IP': address, 'Interface': name}))
+
+        candidates.sort(key=lambda c: c[0])
+        self.by_ip = by_ip
+        self.candidates = [c for _, c in candidates]
+        self.names = names
+        self.built_at = time.monotonic()
+
+    def interface_for(self, ip):
+        """
+        Name of the interface that has this IP, or None.
+        An unknown IP rebuilds the index once (the address may be new).
+        """
+        with self.lock:
+            self._refresh()
+            name = self.by_ip.get(ip)
+            if name is None:
+                self._refresh(force=True)
+                name = self.by_ip.get(ip)
+            return name
+
+    def best(self, ipv4_only=False):
+        """
+        Best real interface as {'IP', 'Interface'}, or None if there is none.
+        ipv4_only - only interfaces with an IPv4 address (gateway and DHCP checks are IPv4).
+        """
+        with self.lock:
+            self._refresh()
+            for candidate in self.candidates:
+                if not ipv4_only or ':' not in candidate['IP']:
+                    return dict(candidate)
+            return None
+
+    def ranked(self):
+        """
+        All real interfaces, best first.
+        """
+        with self.lock:
+            self._refresh()
+            return [dict(c) for c in self.candidates]
+
+
+inventory = Inventory()
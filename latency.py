@@ -0,0 +1,168 @@
+import random
+import socket
+import struct
+import time
+import statistics
+import sys
+
+# ICMP echo types for IPv4 and IPv6
+ICMP_ECHO_REQUEST = {socket.AF_INET: 8, socket.AF_INET6: 128}
+ICMP_ECHO_REPLY = {socket.AF_INET: 0, socket.AF_INET6: 129}
+
+# Ports used for TCP-connect timing when ICMP sockets are not allowed.
+# A refused connection (RST) also proves the host is alive.
+TCP_PORTS = (443, 80, 53)
+
+
+def _checksum(data):
+    """
+    Internet checksum (RFC 1071).
+    """
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _resolve(host):
+    """
+    Return (family, sockaddr) for host. IPv4 is preferred.
+    """
+    infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    infos.sort(key=lambda info: info[0] != socket.AF_INET)
+    family, _, _, _, sockaddr = infos[0]
+    return family, sockaddr
+
+
+def _open_icmp_socket(family):
+    """
+    Unprivileged ICMP datagram socket (Linux with ping_group_range, macOS).
+    Returns None if the kernel does not allow it (Windows, restricted Linux).
+    """
+    proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+    try:
+        return socket.socket(family, socket.SOCK_DGRAM, proto)
+    except (OSError, AttributeError):
+        return None
+
+
+def _icmp_probe(sock, family, sockaddr, ident, seq, timeout):
+    """
+    Send one echo request and wait for the matching reply (same source address,
+    identifier and sequence). Returns RTT in ms or None on timeout.
+    """
+    payload = struct.pack("!d", time.monotonic()) + b'HealthCheck'
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST[family], 0, 0, ident, seq)
+    # Linux fills in the checksum itself, macOS needs it (for IPv6 the kernel always does it)
+    checksum = _checksum(header + payload) if family == socket.AF_INET else 0
+    packet = struct.pack("!BBHHH", ICMP_ECHO_REQUEST[family], 0, checksum, ident, seq) + payload
+
+    start = time.monotonic()
+    end_time = start + timeout
+    sock.sendto(packet, sockaddr)
+    while True:
+        remaining = end_time - time.monotonic()
+        if remaining <= 0:
+            return None
+        sock.settimeout(remaining)
+        try:
+            data, address = sock.recvfrom(2048)
+        except socket.timeout:
+            return None
+        received = time.monotonic()
+        # macOS delivers every echo reply to every ICMP socket - drop other hosts' replies
+        if address[0].split('%', 1)[0] != sockaddr[0].split('%', 1)[0]:
+            continue
+
+        # macOS returns the IPv4 header too, Linux does not
+        if family == socket.AF_INET and len(data) >= 20 and data[0] >> 4 == 4:
+            data = data[(data[0] & 0x0F) * 4:]
+        if len(data) < 8:
+            continue
+        reply_type, _, _, reply_ident, reply_seq = struct.unpack("!BBHHH", data[:8])
+        # Linux replaces our identifier with the socket port (and only hands this socket
+        # its own replies), so there the sequence is enough
+        if (reply_type == ICMP_ECHO_REPLY[family] and reply_seq == seq
+                and (reply_ident == ident or sys.platform.startswith('linux'))):
+            return (received - start) * 1000
+
+
+def _tcp_probe(family, sockaddr, port, timeout):
+    """
+    Time a TCP handshake. Returns RTT in ms or None if the host did not answer.
+    """
+    address = (sockaddr[0], port) + tuple(sockaddr[2:])
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    start = time.monotonic()
+    try:
+        sock.connect(address)
+    except ConnectionRefusedError:
+        pass  # RST came back - host is alive, the port is just closed
+    except OSError:
+        return None
+    finally:
+        sock.close()
+    return (time.monotonic() - start) * 1000
+
+
+def probe_latency(host, count=4, timeout=1.0, interval=0.05):
+    """
+    Measure latency to host in-process, without spawning 'ping'.
+    Uses ICMP datagram sockets when the kernel allows them,
+    otherwise falls back to timing TCP handshakes.
+    Returns dict with Method, Sent, Received, Loss (%), Min/Avg/Max/Jitter (ms).
+    Min/Avg/Max/Jitter are None if nothing came back.
+    """
+    result = {'Host': host, 'Method': None, 'Sent': count, 'Received': 0, 'Loss': 100.0,
+              'Min': None, 'Avg': None, 'Max': None, 'Jitter': None}
+    try:
+        family, sockaddr = _resolve(host)
+    except OSError:
+        return result
+
+    samples = []
+    sock = _open_icmp_socket(family)
+    if sock is not None:
+        result['Method'] = 'icmp'
+        ident = random.getrandbits(16)  # Per call: concurrent probes of one process must not match each other
+        try:
+            for seq in range(1, count + 1):
+                rtt = _icmp_probe(sock, family, sockaddr, ident, seq, timeout)
+                if rtt is not None:
+                    samples.append(rtt)
+                if seq < count:
+                    time.sleep(interval)
+        except OSError:
+            # e.g. "Network is unreachable" - nothing will come back
+            pass
+        finally:
+            sock.close()
+    else:
+        result['Method'] = 'tcp'
+        # Find a port that answers, then keep using it for the rest of the burst
+        ports = list(TCP_PORTS)
+        for i in range(count):
+            rtt = None
+            while ports:
+                rtt = _tcp_probe(family, sockaddr, ports[0], timeout)
+                if rtt is not None or len(ports) == 1 or samples:
+                    break
+                ports.pop(0)
+            if rtt is not None:
+                samples.append(rtt)
+            if i < count - 1:
+                time.sleep(interval)
+
+    if samples:
+        result['Received'] = len(samples)
+        result['Loss'] = round((count - len(samples)) * 100 / count, 1)
+        result['Min'] = round(min(samples), 2)
+        result['Avg'] = round(statistics.mean(samples), 2)
+        result['Max'] = round(max(samples), 2)
+        # Jitter = mean difference between consecutive samples (RFC 3550 style)
+        diffs = [abs(b - a) for a, b in zip(samples, samples[1:])]
+        result['Jitter'] = round(statistics.mean(diffs), 2) if diffs else 0.0
+    return result
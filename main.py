@@ -1,7 +1,8 @@
+import time
+START_TIME = time.perf_counter()  # For the time-to-first-window measurement (startup_profile.py)
+
 import flet as ft
 import threading
-import network_sender
-import time
 import os
 from dotenv import load_dotenv
 
@@ -18,6 +19,35 @@ if not all([gemini_key, telegram_token, telegram_chat_id]):
     print("   Application will continue but Telegram/Gemini may not work")
 
 
+def get_sender():
+    """
+    network_sender (and with it psutil, requests and the Gemini SDK) is imported
+    on first use, so the window appears before the heavy modules are loaded.
+    """
+    import network_sender
+    return network_sender
+
+
+def report_startup_time():
+    """
+    HEALTHCHECK_STARTUP_TIMING=1 prints the time to the first window,
+    'exit' also quits right away (used by startup_profile.py).
+    """
+    mode = os.getenv("HEALTHCHECK_STARTUP_TIMING")
+    if not mode:
+        return
+    print(f"Time to first window: {(time.perf_counter() - START_TIME) * 1000:.0f} ms", flush=True)
+    if mode == "exit":
+        os._exit(0)
+
+
+# At most one page.update() per interval: a burst of probe results is drawn in one go
+UPDATE_INTERVAL = 0.1
+
+# Order of the report sections in the output field
+SECTIONS = ['RAM', 'Disk', 'Network', 'Gateway', 'Public', 'Speed']
+
+
 class HealthCheckApp:
     def __init__(self, page: ft.Page):
         self.page = page
@@ -37,19 +67,12 @@ class HealthCheckApp:
         self.page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
         self.page.vertical_alignment = ft.MainAxisAlignment.CENTER
         
-        # Status messages for scrolling text
-        self.status_messages = [
-            "Ready to scan...",
-            "Initializing diagnostics...",
-            "Checking system health...",
-            "Analyzing network status...",
-            "Scanning disk usage...",
-            "Measuring RAM performance...",
-            "Testing network speed...",
-            "Complete!"
-        ]
-        self.current_status_index = 0
         self.is_scanning = False
+        self.sections = {}  # Section -> summary line, filled while the probes finish
+        self.analysis_shown = False
+        self.scan_id = 0  # Events of older scans (e.g. a late Gemini analysis) are dropped
+        self.ui_lock = threading.Lock()
+        self.ui_dirty = threading.Event()
         
         # Initialize UI components
         self.output_field = ft.TextField(
@@ -66,7 +89,7 @@ class HealthCheckApp:
         )
         
         self.status_text = ft.Text(
-            self.status_messages[0],
+            "Ready to scan...",
             size=14,
             color=ft.Colors.WHITE70,
             text_align=ft.TextAlign.CENTER
@@ -87,6 +110,7 @@ class HealthCheckApp:
         )
         
         self.setup_ui()
+        threading.Thread(target=self.flush_updates, daemon=True).start()
     
     def setup_ui(self):
         """
@@ -152,58 +176,113 @@ class HealthCheckApp:
         self.page.padding = 20
         self.page.add(main_content)
     
-    def update_status(self, message: str):
+    def request_update(self):
         """
-        Update the status text with animation effect.
+        Mark the page as changed. flush_updates() draws it on its next tick.
         """
-        self.status_text.value = message
-        self.page.update()
+        self.ui_dirty.set()
+    
+    def flush_updates(self):
+        """
+        Background loop: one page.update() per UPDATE_INTERVAL at most,
+        covering every change made since the previous one.
+        """
+        while True:
+            self.ui_dirty.wait()
+            self.ui_dirty.clear()
+            try:
+                with self.ui_lock:
+                    self.page.update()
+            except Exception as e:
+                print(f"UI update error: {e}")
+            time.sleep(UPDATE_INTERVAL)
     
-    def animate_status(self):
+    def update_status(self, message: str):
         """
-        Animate status messages during scanning.
+        Update the status text.
         """
-        while self.is_scanning:
-            self.current_status_index = (self.current_status_index + 1) % len(self.status_messages)
-            self.update_status(self.status_messages[self.current_status_index])
-            time.sleep(1.5)
+        with self.ui_lock:
+            self.status_text.value = message
+        self.request_update()
     
     def start_scan(self, e):
         """
         Start the diagnostic scan in a separate thread.
         """
         self.is_scanning = True
+        with self.ui_lock:
+            self.scan_id += 1
+            self.sections = {}
+            self.analysis_shown = False
         self.btn_diagnostics.disabled = True
         self.btn_diagnostics.bgcolor = ft.Colors.GREY_400
         self.output_field.value = "⏳ Collecting data and analyzing... Please wait..."
+        self.status_text.value = "Checking system health..."
         self.page.update()
         
-        # Start status animation
-        animation_thread = threading.Thread(target=self.animate_status, daemon=True)
-        animation_thread.start()
-        
         # Run diagnostics in separate thread
-        threading.Thread(target=self.run_diagnostics).start()
+        threading.Thread(target=self.run_diagnostics, args=(self.scan_id,)).start()
     
-    def run_diagnostics(self):
+    def run_diagnostics(self, scan_id):
         """
         Execute the diagnostic process and update UI.
         """
         try:
-            # Run the main process from network_sender
-            result = network_sender.run_process()
+            # Sections appear in on_event as their probes finish,
+            # the AI analysis arrives there last (possibly after the next scan started)
+            result = get_sender().run_process(
+                on_event=lambda section, value: self.on_event(section, value, scan_id))
             
-            # Update output field with results
-            self.output_field.value = result
+            # Update output field with results (unless the analysis came back first, e.g. from cache)
+            with self.ui_lock:
+                if not self.analysis_shown:
+                    self.output_field.value = result
         except Exception as e:
-            self.output_field.value = f"❌ Error during diagnostics:\n{str(e)}"
+            with self.ui_lock:
+                self.output_field.value = f"❌ Error during diagnostics:\n{str(e)}"
         
-        # Stop animation and re-enable button
-        self.is_scanning = False
-        self.btn_diagnostics.disabled = False
-        self.btn_diagnostics.bgcolor = ft.Colors.BLUE_600
-        self.update_status("Ready to scan...")
-        self.page.update()
+        # Re-enable button
+        with self.ui_lock:
+            self.is_scanning = False
+            self.btn_diagnostics.disabled = False
+            self.btn_diagnostics.bgcolor = ft.Colors.BLUE_600
+            self.status_text.value = "Ready to scan..."
+        self.request_update()
+    
+    def on_event(self, section, value, scan_id=None):
+        """
+        Progress from network_sender.run_process (called from worker threads).
+        Events of a scan that is no longer the current one are ignored.
+        """
+        if scan_id is not None and scan_id != self.scan_id:
+            return
+        if section == 'AI':
+            self.show_analysis(value, scan_id)
+            return
+        if section == 'Report':
+            status = "Analyzing with Gemini..." if value['Network']['Status'] else "Saving offline report..."
+            self.update_status(status)
+            return
+        line = get_sender().format_section(section, value)
+        if line is None:
+            return
+        with self.ui_lock:
+            self.sections[section] = line
+            lines = [self.sections[name] for name in SECTIONS if name in self.sections]
+            self.output_field.value = "\n".join(lines) + "\n\n⏳ Still measuring..."
+            self.status_text.value = f"{section} checked ({', '.join(self.sections)})"
+        self.request_update()
+
+    def show_analysis(self, text: str, scan_id=None):
+        """
+        Replace the raw report with the Gemini analysis once it is ready.
+        """
+        with self.ui_lock:
+            if scan_id is not None and scan_id != self.scan_id:
+                return  # A new scan started meanwhile
+            self.analysis_shown = True
+            self.output_field.value = text
+        self.request_update()
 
 
 def main(page: ft.Page):
@@ -211,6 +290,9 @@ def main(page: ft.Page):
     Main entry point for the Flet application.
     """
     app = HealthCheckApp(page)
+    report_startup_time()
+    # Window is up - load the diagnostics modules while the user looks at it
+    threading.Thread(target=get_sender, daemon=True).start()
 
 
 if __name__ == "__main__":
@@ -1,19 +1,50 @@
 import psutil
 import socket
-import ssl
 import platform
 import os
 import time
 import subprocess
 import re
 from datetime import datetime
-import urllib.request
-import json
-
+import http_pool
+import probe_engine
+import latency
+import speedtest
+import ttl_cache
+import routes
+import interfaces
+import connectivity
+import net_metrics
+import tracing
+import volumes
+
+# External endpoints (the benchmark points them at local stand-ins)
+PUBLIC_DATA_URL = "http://ip-api.com/json/"
+SPEED_URL = "https://speed.cloudflare.com/__down?bytes={bytes}"
+SPEED_BACKUP_URL = "http://ipv4.download.thinkbroadband.com/10MB.zip"
+PING_HOST = "8.8.8.8"
+PING_HOST_V6 = "2001:4860:4860::8888"
+
+# Number of parallel download streams in check_speed()
+SPEED_STREAMS = 4
+# Adaptive speed test: grow the download until one transfer takes about this long (seconds)
+SPEED_TARGET_DURATION = 2.0
+SPEED_MAX_BYTES = 100 * 1024 * 1024  # Upper limit of one round (all streams together)
+SPEED_BACKUP_SIZE = 10 * 1024 * 1024  # The backup file is 10 MB
+
+# Seconds over which interface counters are compared for the 'Traffic' section
+TRAFFIC_WINDOW = 1.0
+
+# Cache for facts that rarely change between checks (public IP, gateway, hostname...).
+# It is cleared automatically when the local IP changes (see get_network_status).
+facts_cache = ttl_cache.TTLCache(maxsize=64)
+
+
+@ttl_cache.cached(facts_cache, ttl=300)
 def get_gateway():
     """
     Get the default gateway IP address.
-    Works on both Windows and macOS.
+    Works on Windows, macOS and Linux.
     """
     gateway = None
     os_type = platform.system()
@@ -39,66 +70,42 @@ def get_gateway():
             if matches:
                 gateway = matches[-1]  # Often the needed gateway is last in the active adapter block
 
-    except Exception:
-        pass  # If something breaks, return None
+        elif os_type == "Linux":  # LINUX
+            # Read the kernel routing table directly, no subprocess
+            defaults = [r for r in routes.default_routes() if r['Family'] == 'IPv4']
+            if defaults:
+                gateway = defaults[0]['Gateway']  # Lowest metric wins
+
+    except Exception as e:
+        tracing.note_error(e)  # If something breaks, return None
 
     return gateway
 
-def find_real_interface_offline():
+
+@ttl_cache.cached(facts_cache, ttl=3600)
+def get_hostname():
     """
-    Find the real network interface when offline.
-    Filters out virtual, loopback, and other non-physical interfaces.
+    Computer name (cached, it almost never changes).
     """
-    stats = psutil.net_if_stats()
-    addrs = psutil.net_if_addrs()
-
-    # 1. UNIFIED BLACKLIST (Combined everything)
-    # If the name contains any of these words - discard it.
-    stop_words = [
-        'loopback', 'virtual', 'pseudo', 'tunnel', 'vmware', 'box',  # Windows junk
-        'bluetooth', 'hyper-v', 'wsl',  # More Windows
-        'utun', 'awdl', 'llw', 'gif', 'stf', 'ap1',  # Mac junk
-        'docker', 'veth', 'br-', 'bridge'  # Linux junk
-    ]
+    return socket.gethostname()
 
-    candidates = []
 
-    for name, stat in stats.items():
-        name_lower = name.lower()
-
-        # --- FILTER 1: Is it up? ---
-        if not stat.isup:
-            continue
-
-        # --- FILTER 2: Exact match (for short names) ---
-        # Exclude 'lo' and 'lo0' (Linux/Mac Loopback) to avoid filtering "Local Area..."
-        if name_lower in ['lo', 'lo0']:
-            continue
-
-        # --- FILTER 3: Search for stop words ---
-        is_junk = False
-        for word in stop_words:
-            if word in name_lower:
-                is_junk = True
-                break
-        if is_junk:
-            continue
+@ttl_cache.cached(facts_cache, ttl=86400)
+def get_boot_time():
+    """
+    System boot time as Unix timestamp (cached, changes only on reboot).
+    """
+    return psutil.boot_time()
 
-        # --- FILTER 4: Has IP? ---
-        # If interface passed all checks, check if it has an IP
-        if name in addrs:
-            for addr in addrs[name]:
-                if addr.family == socket.AF_INET:  # IPv4
-                    # Extra protection against 127.0.0.1
-                    if not addr.address.startswith('127.'):
-                        candidates.append({
-                            'IP': addr.address,
-                            'Interface': name,
-                        })
-                    break
 
-                    # Return first candidate (usually the main one)
-    return candidates[0] if candidates else None
+def find_real_interface_offline():
+    """
+    Find the real network interface when offline.
+    Virtual, loopback and down interfaces are filtered out (see interfaces.JUNK_PATTERN);
+    the rest is ranked by default route, IPv4 before IPv6 and link speed.
+    An IPv4 interface wins, because the DHCP and gateway checks that follow are IPv4 only.
+    """
+    return interfaces.inventory.best(ipv4_only=True) or interfaces.inventory.best()
 
 
 def ping_host(ip):
@@ -106,27 +113,18 @@ def ping_host(ip):
     Returns True if IP responds.
     Returns False if IP is silent.
     """
-    # Determine parameters for Windows (-n) or Mac/Linux (-c)
-    param = '-n' if platform.system().lower() == 'windows' else '-c'
-
-    # Command: ping -c 1 192.168.1.1
-    command = ['ping', param, '1', ip]
+    # In-process ICMP (or TCP-connect) probe, no 'ping' subprocess
+    return latency.probe_latency(ip, count=2, timeout=1.0)['Received'] > 0
 
-    try:
-        # check_call runs the command. If ping is successful - returns 0 (OK).
-        # stdout=subprocess.DEVNULL hides text output to console (to avoid clutter)
-        subprocess.check_call(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return True
-    except subprocess.CalledProcessError:
-        return False
 
+@ttl_cache.cached(facts_cache, ttl=600)
 def get_public_data():
     """
     Get public IP and location data from ip-api.com
     """
     try:
-        with urllib.request.urlopen("http://ip-api.com/json/", timeout=3) as url:
-            data = json.loads(url.read().decode())
+        with http_pool.get(PUBLIC_DATA_URL) as resp:
+            data = resp.json()
             return {
                 'IP': data.get('query', 'Unknown'),
                 'City': data.get('city', 'Unknown'),
@@ -134,33 +132,33 @@ def get_public_data():
                 'Country': data.get('country', 'Unknown'),
                 'ISP': data.get('isp', 'Unknown')
             }
-    except:
+    except Exception as e:
+        tracing.note_error(e)  # Timeout vs. refused vs. bad JSON shows up in report['Timings']
         return None
 
 
-def get_true_ping():
+@tracing.traced('latency')
+def get_latency(host=None, count=4):
     """
-    Run system ping and extract exact time in ms.
-    Works on both Windows and Mac.
+    Burst of latency probes to host.
+    Returns dict with min/avg/max/jitter (ms) and loss (%), see latency.probe_latency().
     """
-    host = "8.8.8.8"
-    param = '-n' if platform.system().lower() == 'windows' else '-c'
-    command = ['ping', param, '1', host]
-
-    try:
-        # Run ping and capture its output (text)
-        output = subprocess.check_output(command, stderr=subprocess.STDOUT).decode(
-            'cp866' if platform.system() == 'Windows' else 'utf-8')
+    return latency.probe_latency(host or PING_HOST, count=count)
 
-        # Search for number after "time=" or "время="
-        # Regex catches: time=14ms, time=14.5 ms, время=14мс
-        match = re.search(r'(?:time|время)[=<]\s*([\d\.]+)', output, re.IGNORECASE)
 
-        if match:
-            return float(match.group(1))  # Return pure number (e.g., 14.5)
+def get_true_ping():
+    """
+    Measure ping to 8.8.8.8 and return average time in ms.
+    Works without spawning 'ping', so the result does not depend on OS language.
+    """
+    try:
+        stats = get_latency()
+        if stats['Avg'] is not None:
+            return stats['Avg']  # Pure number (e.g., 14.5)
         else:
             return "N/A"
-    except:
+    except Exception as e:
+        tracing.note_error(e)
         return "Error"
 
 
@@ -172,39 +170,35 @@ def check_speed():
     """
     result = {'Ping': 0, 'Speed_Mbps': 0}
 
-    # 1. REAL PING
-    result['Ping'] = get_true_ping()
+    # 1. REAL PING (burst of probes: min/avg/max/jitter/loss)
+    try:
+        stats = get_latency()
+        result['Ping'] = stats['Avg'] if stats['Avg'] is not None else "N/A"
+        result['Latency'] = stats
+    except Exception as e:
+        tracing.note_error(e)
+        result['Ping'] = "Error"
 
     # 2. SPEED TEST
     try:
-        # Settings to bypass protection
-        url = "https://speed.cloudflare.com/__down?bytes=10485760"  # 10 MB
+        # Adaptive size: starts at 128 KB and grows until a round lasts ~2 s, so a 3G link
+        # moves a few hundred KB and a gigabit link still gets a long enough transfer.
+        # Several parallel streams once the rounds are big, so one TCP flow does not cap fast links.
 
         # Mask as regular Chrome on Windows/Mac
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
 
-        # Ignore SSL errors (for Mac)
-        ssl_context = ssl._create_unverified_context()
-
-        # Create request with headers
-        req = urllib.request.Request(url, headers=headers)
-
-        start = time.time()
-
-        # Execute request
-        with urllib.request.urlopen(req, timeout=15, context=ssl_context) as resp:
-            data = resp.read()
-            size = len(data)
-
-        duration = time.time() - start
-
-        if duration > 0.1:
-            speed_mbps = (size * 8) / (1024 * 1024) / duration
-            result['Speed_Mbps'] = round(speed_mbps, 2)
-        else:
-            result['Speed_Mbps'] = "> 1000"
+        # Streaming test: constant memory, steady-state speed without handshakes and slow start.
+        # verify=False ignores SSL errors (for Mac)
+        with tracing.span('speed.primary'):
+            throughput = speedtest.adaptive_throughput(lambda size: SPEED_URL.format(bytes=size),
+                                                       streams=SPEED_STREAMS, headers=headers, verify=False,
+                                                       timeout=15, target_duration=SPEED_TARGET_DURATION,
+                                                       max_bytes=SPEED_MAX_BYTES)
+        result['Speed_Mbps'] = throughput['Mbps']
+        result['Throughput'] = throughput
 
     except Exception as e:
         print(f"Cloudflare Speedtest Error: {e}")
@@ -212,123 +206,292 @@ def check_speed():
         # BACKUP OPTION (If Cloudflare still blocks)
         try:
             print("Trying backup server...")
-            url_backup = "http://ipv4.download.thinkbroadband.com/10MB.zip"
-            start = time.time()
-            with urllib.request.urlopen(url_backup, timeout=20) as resp:
-                size = len(resp.read())
-            duration = time.time() - start
-            result['Speed_Mbps'] = round((size * 8) / (1024 * 1024) / duration, 2)
+            with tracing.span('speed.backup'):
+                # Fixed file: Range requests fetch only as much of it as the round needs
+                throughput = speedtest.adaptive_throughput(lambda size: SPEED_BACKUP_URL, timeout=20,
+                                                           target_duration=SPEED_TARGET_DURATION,
+                                                           max_bytes=SPEED_BACKUP_SIZE, range_requests=True)
+            result['Speed_Mbps'] = throughput['Mbps']
+            result['Throughput'] = throughput
         except Exception as e2:
             print(f"Backup Error: {e2}")
+            tracing.note_error(e2)
             result['Speed_Mbps'] = "Error"
 
     return result
 
-def quickcheck():
+def get_disk_path():
     """
-    Perform quick system check and generate report.
+    Path of the main system volume for this OS.
     """
-    report = {}
-    now = datetime.now()
-    report["Time"] = now.strftime("%H:%M:%S")
-    report['Hostname'] = socket.gethostname()
+    if platform.system() == "Windows":
+        return "C://"
+    return "/System/Volumes/Data" if os.path.exists("/System/Volumes/Data") else "/"
 
-    report['OS'] = platform.system()
 
-    uptimesec = time.time() - psutil.boot_time()
-    report["Uptime"] = {}
-    report["Uptime"]['Hours'] = int(uptimesec // 3600)
-    report['Uptime']["Days"] = int((uptimesec // 3600) // 24)
-    
-    if report['OS'] == "Windows":
-        path = "C://"
-    else:
-        path = "/System/Volumes/Data" if os.path.exists("/System/Volumes/Data") else "/"
-        
-    report['Disk'] = {
-        'Total': round(psutil.disk_usage(path).total/(1024**3), 1),
-        'Used': round(psutil.disk_usage(path).total/(1024**3)-psutil.disk_usage(path).free/(1024**3), 1),
-         'Percent': int(psutil.disk_usage(path).percent)
+def get_disk(path):
+    """
+    Disk usage of the main system volume.
+    """
+    usage = psutil.disk_usage(path)
+    return {
+        'Total': round(usage.total/(1024**3), 1),
+        'Used': round(usage.total/(1024**3)-usage.free/(1024**3), 1),
+        'Percent': int(usage.percent)
     }
-    
+
+
+def get_disks(path):
+    """
+    Main system volume (same fields as get_disk) plus every other real mount
+    in 'Volumes' (usage, inodes, status). One statvfs per mount, all mounts
+    at once, so a hung network share only marks its own entry as 'timeout'.
+    """
+    all_volumes = volumes.get_volumes()
+    main_mount = os.path.normpath(path) if platform.system() != "Windows" else "C:\\"
+    main = next((v for v in all_volumes if v['Mount'] == main_mount), None)
+    if main is None:
+        disk = get_disk(path)  # Path is not a mount point of its own
+    else:
+        # A hung main volume stays hung - do not ask it again with a blocking call
+        disk = {key: main.get(key) for key in ('Total', 'Used', 'Percent')}
+    disk['Volumes'] = all_volumes
+    return disk
+
+
+def get_ram():
+    """
+    RAM usage.
+    """
     mem = psutil.virtual_memory()
-    report['RAM'] = {
-      "Total": round(mem.total/(1024**3), 1),
-       "Used": round((mem.total-mem.available)/(1024**3), 1),
+    return {
+        "Total": round(mem.total/(1024**3), 1),
+        "Used": round((mem.total-mem.available)/(1024**3), 1),
         "Percent": int(mem.percent)
     }
-    
-    report['Network'] = {}
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        report['Network']['Status'] = True
-        local_ip = s.getsockname()[0]
-        report['Network']['IP'] = local_ip
-        report['Network']['Interface'] = "Unknown"
-        addrs = psutil.net_if_addrs()
-        for name, addr_list in addrs.items():
-            for addr in addr_list:
-                # Compare interface IP with the one we got from socket
-                if addr.address == local_ip:
-                    report['Network']['Interface'] = name
-                    break  # Found! Break inner loop
-
-            # If found (name is not Unknown), break outer loop
-            if report['Network']['Interface'] != "Unknown":
-                break
-
-    except OSError:
-        report['Network']['Status'] = False
+
+
+def get_network_status():
+    """
+    Check if there is a route to the internet (UDP connect, no packets sent)
+    and find local IP, interface and DHCP status.
+    IPv4 is tried first, an IPv6-only machine counts as online too.
+    """
+    network = {}
+    local_ip = None
+    for family, target in ((socket.AF_INET, PING_HOST), (socket.AF_INET6, PING_HOST_V6)):
+        try:
+            s = socket.socket(family, socket.SOCK_DGRAM)
+            try:
+                s.connect((target, 80))
+                local_ip = s.getsockname()[0]
+            finally:
+                s.close()
+            break
+        except OSError:
+            continue
+
+    network['Status'] = local_ip is not None
+    if local_ip is not None:
+        # New local IP = new network: forget cached public IP, gateway and the interface inventory
+        if facts_cache.note_network(local_ip):
+            interfaces.inventory.invalidate()
+        network['IP'] = local_ip
+        network['Interface'] = interfaces.inventory.interface_for(local_ip) or "Unknown"
+    else:
+        if facts_cache.note_network(None):
+            interfaces.inventory.invalidate()
         offline_data = find_real_interface_offline()
         if offline_data:
-            report['Network'].update(offline_data)
+            network.update(offline_data)
         else:
-            report["Network"]["IP"] = "Offline"
-            report["Network"]["Interface"] = "Unknown"
-            
-    current_ip = str(report['Network'].get('IP', 'Offline'))
-    if current_ip not in ["Offline", "None"]:
+            network["IP"] = "Offline"
+            network["Interface"] = "Unknown"
+
+    current_ip = str(network.get('IP', 'Offline'))
+    # DHCP (and with it the gateway check) is an IPv4 question: an IPv6 address says nothing about it
+    if current_ip not in ["Offline", "None"] and ':' not in current_ip:
         if current_ip.startswith("169.254"):
-            report["Network"]['DHCP'] = False
-        else: 
-            report["Network"]['DHCP'] = True
+            network['DHCP'] = False
+        else:
+            network['DHCP'] = True
+    else:
+        network['DHCP'] = False
+
+    return network
+
+
+def apply_connectivity(network, result):
+    """
+    A route is not proof of being online: with a connectivity matrix (see
+    check_connectivity) 'Status' means that some path really works.
+    The matrix is added as 'Connectivity'.
+    """
+    if result is not None:
+        network['Status'] = result['Status']
+        network['Connectivity'] = result
+    return network
+
+
+def get_gateways():
+    """
+    Default gateway per address family: {'IPv4': address, 'IPv6': address}.
+    IPv6 is only known on Linux (link-local gateways get their %interface scope).
+    """
+    gateways = {'IPv4': get_gateway()}
+    if platform.system() == "Linux":
+        try:
+            defaults = [r for r in routes.default_routes() if r['Family'] == 'IPv6']
+        except Exception as e:
+            tracing.note_error(e)
+            defaults = []
+        if defaults:
+            gateway = defaults[0]['Gateway']
+            if gateway.lower().startswith('fe80'):
+                gateway += '%' + defaults[0]['Interface']
+            gateways['IPv6'] = gateway
+    return gateways
+
+
+def check_connectivity():
+    """
+    Connectivity matrix: gateway, public anycast hosts, DNS and HTTPS, IPv4 and IPv6
+    separately, in one bounded round (see connectivity.check).
+    """
+    return connectivity.check(gateways=get_gateways)
+
+
+def check_gateway():
+    """
+    Find default gateway and check if it responds.
+    """
+    gateway = get_gateway()
+    if gateway:
+        result = {'Gateway': gateway, 'Gateway_Status': ping_host(gateway)}
     else:
-        report["Network"]['DHCP'] = False
-        
+        result = {'Gateway': 'Unknown', 'Gateway_Status': False}
+
+    # On Linux we also know every default route, not only the best one
+    if platform.system() == "Linux":
+        try:
+            result['Default_Routes'] = routes.default_routes()
+        except Exception as e:
+            tracing.note_error(e)
+    return result
+
+
+# Probe name -> report section announced to on_progress (traffic is not shown on its own)
+PROGRESS_SECTIONS = {
+    'disk': 'Disk',
+    'ram': 'RAM',
+    'network': 'Network',
+    'gateway': 'Gateway',
+    'public': 'Public',
+    'speed': 'Speed',
+}
+
+
+def quickcheck(deadline=25.0, include_speed=True, on_progress=None):
+    """
+    Perform quick system check and generate report.
+    Independent probes run concurrently (see probe_engine), so the whole check
+    takes about as long as the slowest probe instead of the sum of all of them.
+    deadline - overall time limit in seconds for all probes together.
+    include_speed - run the speed test (set False for frequent, cheap checks).
+    on_progress(section, result) - called as soon as each section
+    (see PROGRESS_SECTIONS) is measured, before the full report is ready.
+    Every probe is traced: report['Timings'] has its duration and outcome
+    (see tracing), and the spans are exported if an exporter is configured.
+    """
+    trace = tracing.Trace('quickcheck')
+    report = {}
+    now = datetime.now()
+    report["Time"] = now.strftime("%H:%M:%S")
+    report['Hostname'] = get_hostname()
+
+    report['OS'] = platform.system()
+
+    uptimesec = time.time() - get_boot_time()
+    report["Uptime"] = {}
+    report["Uptime"]['Hours'] = int(uptimesec // 3600)
+    report['Uptime']["Days"] = int((uptimesec // 3600) // 24)
+
+    path = get_disk_path()
+
+    def is_online(deps):
+        # Same verdict as report['Network']['Status']: the route check corrected by the matrix
+        return apply_connectivity(dict(deps['network']), deps['connectivity'])['Status'] == True
+
+    def needs_speed(deps):
+        return include_speed and is_online(deps)
+
+    def needs_gateway(deps):
+        # Gateway is only interesting when we are offline but have a DHCP address
+        return deps['network']['Status'] == False and deps['network']['DHCP'] == True
+
+    def probe_done(name, result):
+        if on_progress is not None and name in PROGRESS_SECTIONS:
+            on_progress(PROGRESS_SECTIONS[name], dict(result) if isinstance(result, dict) else result)
+
+    results = probe_engine.run_probes([
+        probe_engine.Probe('disk', lambda deps: get_disks(path)),
+        # Passive read/write rates over the same window as the network traffic
+        probe_engine.Probe('disk_io', lambda deps: volumes.measure_io(TRAFFIC_WINDOW), default={}),
+        probe_engine.Probe('ram', lambda deps: get_ram(), default={'Total': None, 'Used': None, 'Percent': None}),
+        # Gateway, anycast hosts, DNS and HTTPS over IPv4 and IPv6 in one round of at most 1.5 s
+        probe_engine.Probe('connectivity', lambda deps: check_connectivity()),
+        probe_engine.Probe('network', lambda deps: get_network_status(),
+                           default={'Status': False, 'IP': 'Offline', 'Interface': 'Unknown', 'DHCP': False}),
+        probe_engine.Probe('gateway', lambda deps: check_gateway(), requires=['network'], when=needs_gateway),
+        probe_engine.Probe('public', lambda deps: get_public_data(), requires=['network', 'connectivity'],
+                           when=is_online),
+        # Passive traffic window runs before the speed test, so the test's own bytes are not counted
+        probe_engine.Probe('traffic', lambda deps: net_metrics.measure(TRAFFIC_WINDOW), default={}),
+        probe_engine.Probe('speed', lambda deps: check_speed(), requires=['network', 'connectivity', 'traffic'],
+                           when=needs_speed,
+                           default={'Ping': 'Error', 'Speed_Mbps': 'Error'}),
+    ], deadline=deadline, on_result=probe_done, trace=trace)
+
+    report['Disk'] = results['disk'] or {'Total': None, 'Used': None, 'Percent': None, 'Volumes': []}
+    report['Disk']['IO'] = results['disk_io']
+    report['RAM'] = results['ram']
+
+    report['Network'] = apply_connectivity(results['network'], results['connectivity'])
+    # Live utilization of the active interface (bytes/packets/errors/drops per second)
+    report['Network']['Traffic'] = results['traffic'].get(report['Network']['Interface'])
     if report['Network']["Status"] == False and report['Network']["DHCP"] == True:
-        gateway = get_gateway()
-        if gateway:
-            report["Network"]['Gateway'] = gateway
-            if ping_host(gateway):
-                report['Network']['Gateway_Status'] = True
-            else:
-                report['Network']['Gateway_Status'] = False
-        else:
-            report["Network"]['Gateway'] = 'Unknown'
-            report["Network"]['Gateway_Status'] = False
+        gateway = results['gateway']
+        matrix_gateway = (results['connectivity'] or {}).get('IPv4', {}).get('Gateway')
+        if gateway is None and matrix_gateway:
+            # Route exists but no path works: the matrix has already pinged the gateway
+            gateway = {'Gateway': matrix_gateway['Target'], 'Gateway_Status': matrix_gateway['Ok']}
+        report['Network'].update(gateway or {'Gateway': 'Unknown', 'Gateway_Status': False})
     else:
         report["Network"]['Gateway'] = 'No Need'
         report["Network"]['Gateway_Status'] = 'No Need'
-        
+
     if report['Network']["Status"] == True:
-        pub_data = get_public_data()
+        pub_data = results['public']
         if pub_data:
             report['Network']['Public_IP'] = pub_data['IP']
             full_location = f"{pub_data['City']}, {pub_data['State']}, {pub_data['Country']}"
             report['Network']['Location'] = full_location
             report['Network']['ISP'] = pub_data['ISP']
-            speed = check_speed()
-            report['Network']['Speed'] = speed
         else:
             report['Network']['Public_IP'] = "API Error"
             report['Network']['Location'] = "Unknown"
             report['Network']['ISP'] = "Unknown"
+        # The speed test does not depend on ip-api: keep its result even if the lookup failed
+        if include_speed:
+            report['Network']['Speed'] = results['speed']
     else:
         report["Network"]['Public_IP'] = 'Unknown'
         report['Network']['Location'] = 'Unknown'
         report["Network"]['ISP'] = 'Unknown'
 
+    trace.finish()
+    report['Timings'] = trace.timings()
+    tracing.export(trace)
     return report
 
 # Test code (commented out in production)
@@ -0,0 +1,75 @@
+import time
+
+import psutil
+
+# Counter name in psutil -> field name in the report
+COUNTERS = {
+    'bytes_sent': 'Bytes_Sent_Sec',
+    'bytes_recv': 'Bytes_Recv_Sec',
+    'packets_sent': 'Packets_Sent_Sec',
+    'packets_recv': 'Packets_Recv_Sec',
+    'errin': 'Errors_In_Sec',
+    'errout': 'Errors_Out_Sec',
+    'dropin': 'Drops_In_Sec',
+    'dropout': 'Drops_Out_Sec',
+}
+
+
+class InterfaceRates:
+    """
+    Passive per-interface traffic metrics.
+    Keeps the previous psutil.net_io_counters(pernic=True) sample and turns
+    the difference to the next one into per-second rates. No packets are sent.
+    """
+
+    def __init__(self):
+        self.last_time = None
+        self.last_counters = None
+
+    def sample(self):
+        """
+        Take a new sample.
+        Returns dict interface -> rates since the previous sample
+        (empty dict on the first call, which only primes the counters).
+        """
+        now = time.monotonic()
+        counters = psutil.net_io_counters(pernic=True)
+        rates = {}
+        if self.last_counters is not None:
+            elapsed = now - self.last_time
+            if elapsed > 0:
+                for nic, current in counters.items():
+                    previous = self.last_counters.get(nic)
+                    if previous is None:
+                        continue  # New interface, no baseline yet
+                    rates[nic] = {
+                        # Counters can reset or wrap - never report negative rates
+                        field: round(max(0, getattr(current, name) - getattr(previous, name)) / elapsed, 1)
+                        for name, field in COUNTERS.items()
+                    }
+        self.last_time = now
+        self.last_counters = counters
+        return rates
+
+
+def measure(interval=1.0):
+    """
+    Rates of all interfaces over the next 'interval' seconds.
+    """
+    sampler = InterfaceRates()
+    sampler.sample()
+    time.sleep(interval)
+    return sampler.sample()
+
+
+def totals(rates, skip=('lo', 'lo0')):
+    """
+    Sum of rates over all interfaces except loopback.
+    """
+    result = {field: 0.0 for field in COUNTERS.values()}
+    for nic, nic_rates in rates.items():
+        if nic in skip:
+            continue
+        for field, value in nic_rates.items():
+            result[field] += value
+    return {field: round(value, 1) for field, value in result.items()}
@@ -1,8 +1,15 @@
 import os
+import gzip
 import json
-import requests
-from google import genai  # <--- NEW LIBRARY
-from google.genai import types
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import ttl_cache
+import tsdb
+import outbox
+import alerts
+import telegram_delivery
 from dotenv import load_dotenv
 import monitor_sys
 
@@ -15,23 +22,128 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Check loading of all necessary secrets
-if not all([TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, GEMINI_API_KEY]):
-    raise ValueError(
-        "Missing required environment variables! "
-        "Please ensure your .env file contains: "
-        "TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, GEMINI_API_KEY"
-    )
+# API endpoints (optional, e.g. to point at local stand-ins for benchmarks)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+# How the JSON attachment is encoded: pretty, compact, gzip or auto (see encode_report)
+REPORT_ENCODING = os.getenv("REPORT_ENCODING", "pretty")
+GZIP_THRESHOLD = 256 * 1024  # 'auto' switches to gzip above this size (bytes)
+
+# Volatile report fields ignored by the Gemini cache (paths inside the report)
+VOLATILE_FIELDS = [
+    ('Time',),
+    ('Uptime',),
+    ('Network', 'Traffic'),
+    ('Network', 'Speed', 'Latency'),
+    ('Network', 'Speed', 'Throughput'),
+    ('Timings',),
+    ('Disk', 'IO'),
+    ('Disk', 'Volumes'),
+    ('Network', 'Connectivity', 'DNS'),
+    ('Network', 'Connectivity', 'IPv4'),
+    ('Network', 'Connectivity', 'IPv6'),
+    ('Network', 'Connectivity', 'Duration_ms'),
+    ('Alerts', 'Raised'),
+    ('Alerts', 'Cleared'),
+]
+# Measurements rounded before fingerprinting, so small noise does not count as a change
+ROUNDED_FIELDS = {
+    ('Disk', 'Used'): 1,
+    ('RAM', 'Used'): 1,
+    ('RAM', 'Percent'): 5,
+    ('Network', 'Speed', 'Ping'): 10,
+    ('Network', 'Speed', 'Speed_Mbps'): 10,
+}
+AI_CACHE_TTL = 3600  # Seconds an answer for the same state is reused
+
+ai_cache = ttl_cache.TTLCache(maxsize=32, default_ttl=AI_CACHE_TTL)
+_gemini_client = None
+_gemini_lock = threading.Lock()
+_ai_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gemini")
+_in_flight = {}  # fingerprint -> Future of a running analysis
+_delivery = None
+_delivery_lock = threading.Lock()
+
+
+
+def _check_config():
+    """
+    Check loading of all necessary secrets.
+    Done on first use (not at import), so the GUI starts without a complete .env.
+    """
+    if not all([TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, GEMINI_API_KEY]):
+        raise ValueError(
+            "Missing required environment variables! "
+            "Please ensure your .env file contains: "
+            "TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, GEMINI_API_KEY"
+        )
+
+
+def get_gemini_client():
+    """
+    One Gemini client for the whole process (created on first use),
+    so every analysis reuses its HTTP connections.
+    """
+    global _gemini_client
+    with _gemini_lock:
+        if _gemini_client is None:
+            _check_config()
+            # The SDK (and its pydantic/httpx stack) is the slowest import of the app
+            from google import genai
+            from google.genai import types
+
+            if GEMINI_BASE_URL:
+                _gemini_client = genai.Client(api_key=GEMINI_API_KEY,
+                                              http_options=types.HttpOptions(base_url=GEMINI_BASE_URL))
+            else:
+                _gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+        return _gemini_client
+
+
+def _quantize(value, step):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(value / step) * step
+    return value
+
+
+def report_fingerprint(report):
+    """
+    Hash of the report without volatile fields (Time, Uptime, live traffic,
+    raw latency/throughput samples) and with measurements rounded to coarse steps.
+    Two reports with the same fingerprint describe the same state of the machine.
+    """
+    normalized = json.loads(json.dumps(report, default=str))  # Deep copy
+    for path in VOLATILE_FIELDS:
+        node = normalized
+        for key in path[:-1]:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, dict):
+            node.pop(path[-1], None)
+    for path, step in ROUNDED_FIELDS.items():
+        node = normalized
+        for key in path[:-1]:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, dict) and path[-1] in node:
+            node[path[-1]] = _quantize(node[path[-1]], step)
+    data = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
 
 
 def ask_gemini(report_json):
     """
     Use the new google-genai SDK to analyze system report.
     Returns English response from Gemini AI.
+    The answer is cached by report fingerprint, so an unchanged state
+    does not pay for a second model call.
     """
+    fingerprint = report_fingerprint(report_json)
+    cached = ai_cache.get(fingerprint)
+    if cached is not None:
+        return cached
+
     try:
-        # Initialize client (as in example from AI Studio)
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        client = get_gemini_client()
 
         prompt_text = (
             f"You are a system administrator. Analyze this JSON system health report. "
@@ -48,48 +160,140 @@ def ask_gemini(report_json):
         )
 
         # In the new SDK, text is located here:
+        ai_cache.set(fingerprint, response.text)
         return response.text
 
     except Exception as e:
         return f"Gemini Error (New SDK): {str(e)}"
 
 
-def send_to_telegram(text_report, json_report):
+def ask_gemini_async(report_json):
+    """
+    Start the Gemini analysis in the background and return a Future with the text.
+    If the same state (fingerprint) is already being analyzed, its Future is reused.
+    """
+    fingerprint = report_fingerprint(report_json)
+    with _gemini_lock:
+        future = _in_flight.get(fingerprint)
+        if future is None:
+            future = _ai_executor.submit(ask_gemini, report_json)
+            _in_flight[fingerprint] = future
+            future.add_done_callback(lambda f: _in_flight.pop(fingerprint, None))
+    return future
+
+
+def encode_report(report, encoding=None, name="report"):
+    """
+    Serialize report (or a list of reports) for the Telegram attachment.
+    encoding: 'pretty' (indented JSON), 'compact' (no whitespace),
+    'gzip' (compact JSON, gzip-compressed) or 'auto' (pretty, gzip if large).
+    Default comes from REPORT_ENCODING.
+    Returns (filename, bytes, mime type).
+    """
+    encoding = encoding or REPORT_ENCODING
+    if encoding in ("compact", "gzip"):
+        data = json.dumps(report, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    else:
+        data = json.dumps(report, indent=4, ensure_ascii=False).encode("utf-8")
+        if encoding == "auto" and len(data) > GZIP_THRESHOLD:
+            encoding = "gzip"
+
+    if encoding == "gzip":
+        return f"{name}.json.gz", gzip.compress(data), "application/gzip"
+    return f"{name}.json", data, "application/json"
+
+
+def get_delivery():
+    """
+    Shared Telegram delivery queue (one rate limit for every report this process sends).
+    """
+    global _delivery
+    with _delivery_lock:
+        if _delivery is None:
+            _delivery = telegram_delivery.TelegramDelivery(
+                f"{TELEGRAM_API_URL}/bot{TELEGRAM_TOKEN}", TELEGRAM_CHAT_ID, encode_report)
+        return _delivery
+
+
+def send_to_telegram(text_report, json_report, wait=True):
     """
     Send report to Telegram bot with text message and JSON file attachment.
+    Goes through the delivery queue (rate limit, retries, flood control); with wait=True
+    blocks until Telegram accepted it (returns True/False). With wait=False returns the
+    delivery Future right away (None if Telegram is not configured).
+    A report that cannot be delivered is queued in the outbox.
+    """
+    try:
+        _check_config()
+        future = get_delivery().submit(f"🤖 *Report:*\n{text_report}", [json_report])
+    except Exception as e:
+        print(f"Telegram Error: {e}")
+        return False if wait else None
+    if not wait:
+        return future
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Telegram Error: {e}")
+        return False
+
+
+def send_batch_to_telegram(reports):
+    """
+    Send several queued (offline) reports at once: one message with the
+    Gemini analysis of all of them and one JSON document containing the list.
+    Returns True only if Telegram accepted both.
     """
     try:
-        # 1. Send text message
-        url_msg = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        requests.post(url_msg, data={
-            "chat_id": TELEGRAM_CHAT_ID,
-            "text": f"🤖 *Report:*\n{text_report}",
-            "parse_mode": "Markdown"
-        })
-
-        # 2. Send JSON file
-        temp_file = "temp_log.json"
-        with open(temp_file, "w", encoding="utf-8") as f:
-            json.dump(json_report, f, indent=4, ensure_ascii=False)
-
-        url_doc = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendDocument"
-        with open(temp_file, "rb") as f:
-            requests.post(url_doc, data={"chat_id": TELEGRAM_CHAT_ID}, files={"document": f})
-
-        os.remove(temp_file)
-        return True
+        _check_config()
+        analysis = ask_gemini(reports)
+        first, last = reports[0], reports[-1]
+        header = (
+            f"📦 {len(reports)} delayed report(s) from {first.get('Hostname', 'Unknown')}, "
+            f"{first.get('Date', '')} {first.get('Time', '')} - {last.get('Date', '')} {last.get('Time', '')}"
+        )
+        # No Markdown here, and no outbox fallback: these reports already are in the outbox
+        future = get_delivery().submit(f"{header}\n\n{analysis}", reports, markdown=False, fallback=False)
+        return future.result()
+    except outbox.Rejected:
+        raise  # Refused for good: the outbox sets these reports aside instead of retrying them
     except Exception as e:
         print(f"Telegram Error: {e}")
         return False
 
 
+def drain_outbox():
+    """
+    Send reports that were queued while offline. Returns number of reports sent.
+    """
+    try:
+        _check_config()
+    except ValueError as e:
+        print(f"Outbox Error: {e}")
+        return 0  # Keep everything queued until the keys are configured
+    # The delivery queue already retries every request - one try per batch here
+    return outbox.drain(send_batch_to_telegram, max_retries=1)
+
+
+def send_alert(report):
+    """
+    Report an alert state change (see alerts.AlertEngine): Gemini analysis and
+    Telegram when online, the outbox when offline.
+    """
+    if report['Network']['Status']:
+        send_to_telegram(ask_gemini(report), report)
+    else:
+        outbox.enqueue(report)
+
+
 def save_offline(report_data):
     """
     Save offline report to desktop as a text file.
     """
     desktop = os.path.join(os.path.join(os.path.expanduser('~')), 'Desktop')
-    # Remove colons from filename for compatibility
-    timestamp = report_data['Time'].replace(":", "-")
+    # Date + time (report 'Time' has no date, so files from different days would overwrite each other).
+    # No colons in filename for compatibility
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     filename = os.path.join(desktop, f"System_Report_{timestamp}.txt")
 
     text = (
@@ -104,21 +308,144 @@ def save_offline(report_data):
     return filename
 
 
-def run_process():
+def format_section(section, value):
+    """
+    One summary line for a report section (as passed to quickcheck's on_progress).
+    Returns None if there is nothing to show.
+    """
+    if not isinstance(value, dict):
+        return None
+    if section in ('RAM', 'Disk'):
+        line = f"{section}: {value.get('Used')}/{value.get('Total')} GB ({value.get('Percent')}%)"
+        # Other mounts only when something is wrong with them
+        for volume in value.get('Volumes', []):
+            if volume['Status'] != 'ok':
+                line += f"\n  ⚠️ {volume['Mount']}: {volume['Status']}"
+            elif volume['Percent'] >= 90 or (volume['Inodes_Percent'] or 0) >= 90:
+                line += f"\n  ⚠️ {volume['Mount']}: {volume['Percent']}% used, inodes {volume['Inodes_Percent']}%"
+        return line
+    if section == 'Network':
+        line = f"Network: {value.get('IP')} ({value.get('Interface')})"
+        failed = (value.get('Connectivity') or {}).get('Failed_Layer')
+        if failed:
+            line += f"\n  ⚠️ {failed} layer failing"
+        return line
+    if section == 'Gateway':
+        state = "reachable" if value.get('Gateway_Status') else "unreachable"
+        return f"Gateway: {value.get('Gateway')} ({state})"
+    if section == 'Public':
+        return f"Public IP: {value.get('IP')}, {value.get('City')}, {value.get('Country')} ({value.get('ISP')})"
+    if section == 'Speed':
+        if value.get('Speed_Mbps') == 'Error':
+            return "Speed: test failed"
+        return f"Speed: {value.get('Speed_Mbps')} Mbps, ping {value.get('Ping')} ms"
+    if section == 'Alerts':
+        if not value.get('Active'):
+            return None
+        return "⚠️ Alerts: " + "; ".join(value['Active'].values())
+    return None
+
+
+def format_summary(report):
+    """
+    Short human-readable summary of the raw report (shown before the AI answer arrives).
+    """
+    network = report['Network']
+    lines = [
+        format_section('RAM', report['RAM']),
+        format_section('Disk', report['Disk']),
+        format_section('Network', network),
+    ]
+    speed = network.get('Speed')
+    if speed:
+        lines.append(format_section('Speed', speed))
+    alert_line = format_section('Alerts', report.get('Alerts'))
+    if alert_line:
+        lines.append(alert_line)
+    return "\n".join(lines)
+
+
+def run_process(on_analysis=None, on_event=None):
     """
     Main process: collect data, check network status, and send report.
     Returns status message.
+    If on_analysis is given, the raw report is returned right away and the
+    Gemini analysis + Telegram report happen in the background;
+    on_analysis(text) is called with the final message when they are done.
+    on_event(section, value) streams progress: every report section as soon as
+    its probe finishes (see monitor_sys.PROGRESS_SECTIONS), then 'Report' with
+    the full report and, for online checks, 'AI' with the final message
+    (the analysis then also runs in the background).
     """
+    def emit(section, value):
+        if on_event is not None:
+            on_event(section, value)
+
     # 1. Collect data
-    data = monitor_sys.quickcheck()
+    data = monitor_sys.quickcheck(on_progress=emit if on_event is not None else None)
+
+    # Local verdict (thresholds and baselines) before anything is sent
+    try:
+        engine = alerts.AlertEngine.load(alerts.GUI_STATE_FILE)  # The daemon owns alerts.STATE_FILE
+        data['Alerts'] = engine.summary(engine.check(alerts.values_from_report(data)))
+        engine.save(alerts.GUI_STATE_FILE)
+    except Exception as e:
+        print(f"Alerts Error: {e}")
+    emit('Report', data)
+
+    # Keep numeric history (RAM/Disk/ping/speed/gateway) for range queries
+    try:
+        tsdb.append_report(data, directory=tsdb.GUI_HISTORY_DIR)  # The daemon owns tsdb.HISTORY_DIR
+    except Exception as e:
+        print(f"History Error: {e}")
 
     # 2. Check network
     if data['Network']['Status']:
         # ONLINE
-        ai_response = ask_gemini(data)
-        send_to_telegram(ai_response, data)
-        return f"✅ STATUS: ONLINE\n\nGemini Response:\n{ai_response}"
+        # Link is back - send what was queued while offline, without blocking this report
+        if outbox.pending():
+            threading.Thread(target=drain_outbox, daemon=True).start()
+
+        if on_analysis is None and on_event is None:
+            ai_response = ask_gemini(data)
+            send_to_telegram(ai_response, data)
+            return f"✅ STATUS: ONLINE\n\nGemini Response:\n{ai_response}"
+
+        def finish(future):
+            ai_response = future.result()
+            message = f"✅ STATUS: ONLINE\n\nGemini Response:\n{ai_response}"
+
+            def delivered(delivery=None):
+                # Done only once Telegram has the report (or it is safe in the outbox)
+                text = message
+                if delivery is not None:
+                    error = delivery.exception()
+                    if error is not None:
+                        text += f"\n\n⚠️ Telegram refused the report: {error}"
+                    elif not delivery.result():
+                        text += "\n\n⚠️ Telegram unreachable, the report is queued in the outbox"
+                emit('AI', text)
+                if on_analysis is not None:
+                    on_analysis(text)
+
+            # Runs on a Gemini worker: do not hold it through Telegram's flood waits
+            delivery = send_to_telegram(ai_response, data, wait=False)
+            if delivery is None:
+                delivered()
+            else:
+                delivery.add_done_callback(delivered)
+
+        ask_gemini_async(data).add_done_callback(finish)
+        return f"✅ STATUS: ONLINE\n\n{format_summary(data)}\n\n⏳ Gemini analysis in progress..."
     else:
         # OFFLINE
-        path = save_offline(data)
-        return f"❌ STATUS: OFFLINE\nData saved to desktop:\n{os.path.basename(path)}"
\ No newline at end of file
+        # Full report waits in the outbox and goes to Telegram when the link is back.
+        # Queued first: the Desktop copy is only a convenience (headless hosts have no Desktop)
+        outbox.enqueue(data)
+        message = "❌ STATUS: OFFLINE\n"
+        try:
+            path = save_offline(data)
+            message += f"Data saved to desktop:\n{os.path.basename(path)}\n"
+        except OSError as e:
+            print(f"Offline Save Error: {e}")
+        return message + "Report queued, it will be sent when the connection returns."
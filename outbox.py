@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import tsdb
+
+# Reports written while offline wait here until they can be sent
+OUTBOX_DIR = os.path.join(tsdb.DATA_DIR, "outbox")
+MAX_PENDING = 1000  # Oldest reports are dropped beyond this, so the disk never fills up
+LOCK_TIMEOUT = 600  # Seconds after which a drain lock is considered stale (crashed process)
+
+_lock = threading.Lock()
+
+
+class Rejected(Exception):
+    """
+    Raised by a sender when the reports will never be accepted (e.g. Telegram answered 4xx).
+    Such reports are set aside as '.rejected' files instead of being retried forever.
+    """
+
+
+def _write(report, directory, suffix=".json"):
+    os.makedirs(directory, exist_ok=True)
+    # Report 'Time' has no date - remember when it was queued
+    report = dict(report)
+    report.setdefault('Date', datetime.now().strftime("%Y-%m-%d"))
+    name = f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}{suffix}"
+    path = os.path.join(directory, name)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def enqueue(report, directory=None):
+    """
+    Durably store a full JSON report. The file is written under a temporary
+    name and renamed, so a crash never leaves a half-written report.
+    Returns the file path.
+    """
+    directory = directory or OUTBOX_DIR
+    path = _write(report, directory)
+
+    queued = pending(directory)
+    for old in queued[:max(0, len(queued) - MAX_PENDING)]:
+        _remove(old)
+    return path
+
+
+def reject(report, directory=None):
+    """
+    Keep a report that was refused for good next to the queue ('.rejected', never sent again).
+    Returns the file path.
+    """
+    return _write(report, directory or OUTBOX_DIR, ".json.rejected")
+
+
+def _reject_files(paths):
+    for path in paths:
+        try:
+            os.replace(path, path + ".rejected")
+        except OSError:
+            pass
+
+
+def pending(directory=None):
+    """
+    Paths of queued reports, oldest first.
+    """
+    directory = directory or OUTBOX_DIR
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(".json")]
+    except FileNotFoundError:
+        return []
+    # Names start with a nanosecond timestamp - sorting by number is sorting by age
+    names.sort(key=lambda n: int(n.split("-", 1)[0]) if n.split("-", 1)[0].isdigit() else 0)
+    return [os.path.join(directory, n) for n in names]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _load(paths):
+    """
+    Read queued reports. Unreadable files are renamed to .bad and skipped.
+    """
+    reports, loaded = [], []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                reports.append(json.load(f))
+            loaded.append(path)
+        except (OSError, ValueError):
+            try:
+                os.replace(path, path + ".bad")
+            except OSError:
+                pass
+    return reports, loaded
+
+
+def _acquire_drain_lock(directory):
+    """
+    Only one process drains at a time (e.g. GUI and daemon on the same machine).
+    """
+    lock_path = os.path.join(directory, ".drain.lock")
+    try:
+        if time.time() - os.path.getmtime(lock_path) > LOCK_TIMEOUT:
+            _remove(lock_path)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return lock_path
+    except FileExistsError:
+        return None
+
+
+def drain(send_batch, directory=None, batch_size=10, min_interval=3.0, max_retries=3, backoff=2.0):
+    """
+    Send queued reports in batches.
+    send_batch(list of reports) must return True on success.
+    Batches are at least min_interval seconds apart (rate limit); a failed batch is
+    retried with exponential backoff, and after max_retries the drain stops,
+    leaving everything queued for the next attempt. A batch the sender rejects
+    for good (raises Rejected) is renamed to '.rejected' and the drain goes on.
+    Returns number of reports sent.
+    """
+    directory = directory or OUTBOX_DIR
+    if not pending(directory):
+        return 0
+    with _lock:
+        lock_path = _acquire_drain_lock(directory)
+        if lock_path is None:
+            return 0
+        sent = 0
+        last_batch = 0.0
+        try:
+            while True:
+                reports, paths = _load(pending(directory)[:batch_size])
+                if not paths:
+                    break
+                wait = min_interval - (time.monotonic() - last_batch)
+                if wait > 0:
+                    time.sleep(wait)
+
+                rejected = False
+                for attempt in range(max_retries):
+                    last_batch = time.monotonic()
+                    try:
+                        ok = send_batch(reports)
+                    except Rejected as e:
+                        print(f"Outbox Error: {e} - {len(paths)} report(s) set aside as .rejected")
+                        _reject_files(paths)
+                        rejected = True
+                        break
+                    except Exception as e:
+                        print(f"Outbox Error: {e}")
+                        ok = False
+                    if ok:
+                        break
+                    time.sleep(backoff * 2 ** attempt)
+                else:
+                    return sent  # Still failing - try again on the next drain
+                if rejected:
+                    continue
+
+                for path in paths:
+                    _remove(path)
+                sent += len(paths)
+        finally:
+            _remove(lock_path)
+        return sent
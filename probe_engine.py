@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import tracing
+
+
+class Probe:
+    """
+    One step of a health check.
+    func receives a dict with the results of the probes listed in 'requires'.
+    If 'when' returns False for those results, the probe is skipped and gets 'default'.
+    """
+
+    def __init__(self, name, func, requires=(), when=None, default=None):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.when = when
+        self.default = default
+
+
+def _notify(on_result, name, result):
+    if on_result is None:
+        return
+    try:
+        on_result(name, result)
+    except Exception as e:
+        print(f"Probe callback error ({name}): {e}")
+
+
+def run_probes(probes, deadline=25.0, max_workers=8, on_result=None, trace=None):
+    """
+    Run probes concurrently, respecting dependencies between them.
+    Every probe starts as soon as all of its requirements are finished.
+    The whole run is limited by one overall deadline (seconds): probes that
+    did not finish in time get their default value.
+    on_result(name, result) is called as soon as each probe that was started
+    finishes (or fails / runs out of time); skipped probes are not reported.
+    trace - optional tracing.Trace: every probe gets a span with its duration
+    and outcome (ok / error / timeout / skipped).
+    Returns dict {probe name: result}.
+    """
+    by_name = {p.name: p for p in probes}
+    for probe in probes:
+        for dep in probe.requires:
+            if dep not in by_name:
+                raise ValueError(f"Probe '{probe.name}' requires unknown probe '{dep}'")
+
+    results = {}
+    waiting = list(probes)
+    running = {}  # future -> probe
+    spans = {}  # probe name -> tracing.Span
+    end_time = time.monotonic() + deadline
+
+    # Threads that are still stuck in a timeout after the deadline are left behind
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+    try:
+        while waiting or running:
+            # 1. Start (or skip) every probe whose requirements are done
+            started = True
+            while started:
+                started = False
+                for probe in list(waiting):
+                    if not all(dep in results for dep in probe.requires):
+                        continue
+                    waiting.remove(probe)
+                    deps = {dep: results[dep] for dep in probe.requires}
+                    if probe.when is not None and not probe.when(deps):
+                        results[probe.name] = probe.default
+                        if trace is not None:
+                            trace.skipped(probe.name)
+                        started = True  # Skipped probe may unblock others
+                        continue
+                    if trace is not None:
+                        # Span is current inside the worker, so nested spans and note_error() land on it
+                        span = spans[probe.name] = trace.span(probe.name)
+                        future = executor.submit(tracing.activate, span, probe.func, deps)
+                    else:
+                        future = executor.submit(probe.func, deps)
+                    running[future] = probe
+
+            if not running:
+                if waiting:
+                    # Nothing can start anymore (circular requirements)
+                    names = ", ".join(p.name for p in waiting)
+                    raise ValueError(f"Probes can never start: {names}")
+                break
+
+            # 2. Wait for the next probe to finish
+            remaining = end_time - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                probe = running.pop(future)
+                try:
+                    results[probe.name] = future.result()
+                except Exception as e:
+                    results[probe.name] = probe.default
+                    if probe.name in spans:
+                        spans[probe.name].note_error(e)
+                if probe.name in spans:
+                    spans[probe.name].finish()
+                _notify(on_result, probe.name, results[probe.name])
+    finally:
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+    # 3. Deadline reached: everything unfinished gets its default
+    for probe in list(running.values()) + waiting:
+        results[probe.name] = probe.default
+    for probe in running.values():
+        if probe.name in spans:
+            spans[probe.name].finish(outcome=tracing.TIMEOUT, error="DeadlineExceeded")
+        _notify(on_result, probe.name, probe.default)
+    if trace is not None:
+        for probe in waiting:
+            trace.skipped(probe.name, error="DeadlineExceeded")  # Requirements did not finish in time
+
+    return results
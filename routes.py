@@ -0,0 +1,98 @@
+import socket
+import struct
+
+# Linux kernel routing tables
+PROC_ROUTE = "/proc/net/route"
+PROC_IPV6_ROUTE = "/proc/net/ipv6_route"
+
+RTF_UP = 0x0001
+RTF_GATEWAY = 0x0002
+
+
+def _ipv4_from_hex(value):
+    # /proc/net/route stores addresses as little-endian hex
+    return socket.inet_ntoa(struct.pack("<I", int(value, 16)))
+
+
+def _ipv6_from_hex(value):
+    return socket.inet_ntop(socket.AF_INET6, bytes.fromhex(value))
+
+
+def _mask_to_prefix(mask_hex):
+    return bin(int(mask_hex, 16)).count("1")
+
+
+def read_ipv4_routes(path=PROC_ROUTE):
+    """
+    Parse the IPv4 routing table from procfs.
+    Returns list of dicts: Family, Destination, Gateway, Interface, Metric.
+    """
+    routes = []
+    with open(path) as f:
+        next(f, None)  # Header line
+        for line in f:
+            fields = line.split()
+            if len(fields) < 8:
+                continue
+            iface, dest, gateway, flags, _, _, metric, mask = fields[:8]
+            flags = int(flags, 16)
+            if not flags & RTF_UP:
+                continue
+            routes.append({
+                'Family': 'IPv4',
+                'Destination': f"{_ipv4_from_hex(dest)}/{_mask_to_prefix(mask)}",
+                'Gateway': _ipv4_from_hex(gateway) if flags & RTF_GATEWAY else None,
+                'Interface': iface,
+                'Metric': int(metric),
+            })
+    return routes
+
+
+def read_ipv6_routes(path=PROC_IPV6_ROUTE):
+    """
+    Parse the IPv6 routing table from procfs (same dict format as IPv4).
+    """
+    routes = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 10:
+                continue
+            dest, dest_len, _, _, next_hop, metric, _, _, flags, iface = fields[:10]
+            flags = int(flags, 16)
+            # Skip routes that are down and the loopback/unreachable entries
+            if not flags & RTF_UP or iface == 'lo':
+                continue
+            routes.append({
+                'Family': 'IPv6',
+                'Destination': f"{_ipv6_from_hex(dest)}/{int(dest_len, 16)}",
+                'Gateway': _ipv6_from_hex(next_hop) if flags & RTF_GATEWAY else None,
+                'Interface': iface,
+                'Metric': int(metric, 16),
+            })
+    return routes
+
+
+def read_routes():
+    """
+    All IPv4 and IPv6 routes. A table that cannot be read is skipped
+    (e.g. IPv6 disabled, or not Linux).
+    """
+    routes = []
+    for reader in (read_ipv4_routes, read_ipv6_routes):
+        try:
+            routes.extend(reader())
+        except OSError:
+            pass
+    return routes
+
+
+def default_routes():
+    """
+    Default routes (0.0.0.0/0 and ::/0) with a gateway, best first:
+    IPv4 before IPv6, then lowest metric.
+    """
+    defaults = [r for r in read_routes()
+                if r['Destination'] in ('0.0.0.0/0', '::/0') and r['Gateway']]
+    defaults.sort(key=lambda r: (r['Family'] != 'IPv4', r['Metric']))
+    return defaults
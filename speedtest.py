@@ -0,0 +1,211 @@
+import math
+import threading
+import time
+from array import array
+
+import http_pool
+
+
+def _to_mbps(size, duration):
+    """
+    Same formula as the rest of the app: (bytes * 8) / (1024 * 1024) / seconds.
+    """
+    return (size * 8) / (1024 * 1024) / duration
+
+
+def _percentile(sorted_values, pct):
+    """
+    Percentile with linear interpolation over an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * pct / 100
+    low = math.floor(pos)
+    high = math.ceil(pos)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+class _Stream:
+    """
+    One download stream. Reads the body into a single preallocated buffer
+    and only keeps byte counts per time bucket, so memory does not grow with
+    the download size.
+    """
+
+    def __init__(self, url, headers, timeout, verify, chunk_size, buckets, interval, t0, stop_at, limit=None):
+        self.url = url
+        self.limit = limit  # Stop after this many bytes (server may ignore a Range header)
+        self.headers = headers
+        self.timeout = timeout
+        self.verify = verify
+        self.chunk_size = chunk_size
+        self.interval = interval
+        self.t0 = t0
+        self.stop_at = stop_at
+        self.bytes_per_bucket = array('d', bytes(8 * buckets))
+        self.first_byte = None  # seconds after t0
+        self.last_byte = None
+        self.total = 0
+        self.error = None
+
+    def run(self):
+        buf = bytearray(self.chunk_size)
+        view = memoryview(buf)
+        last_bucket = len(self.bytes_per_bucket) - 1
+        try:
+            with http_pool.get(self.url, headers=self.headers, timeout=self.timeout,
+                               verify=self.verify, stream=True) as resp:
+                resp.raise_for_status()
+                while True:
+                    n = resp.raw.readinto(view)
+                    if not n:
+                        break
+                    now = time.monotonic()
+                    offset = now - self.t0
+                    if self.first_byte is None:
+                        self.first_byte = offset
+                    self.last_byte = offset
+                    self.total += n
+                    self.bytes_per_bucket[min(int(offset / self.interval), last_bucket)] += n
+                    if now >= self.stop_at or (self.limit and self.total >= self.limit):
+                        break
+        except Exception as e:
+            self.error = e
+        finally:
+            view.release()
+
+
+def measure_throughput(url, streams=1, headers=None, verify=True, timeout=15,
+                       max_duration=15.0, ramp_up=0.5, interval=0.1, chunk_size=64 * 1024, limit=None):
+    """
+    Streaming download speed test.
+    url can be one URL (used by every stream) or a list with one URL per stream.
+    Connections come from the shared pool (http_pool), so repeated tests reuse them.
+    Timing starts at the first body byte, so DNS, TCP and TLS handshakes are not counted.
+    limit - optional maximum bytes per stream.
+    The first 'ramp_up' seconds (TCP slow start) are dropped, and speed is taken
+    from the steady-state part of the transfer, where all streams are running.
+    Returns dict:
+        Mbps - steady-state speed
+        Bytes - total bytes downloaded
+        Duration - seconds from first to last byte
+        Streams - number of streams that worked
+        Samples - P10/P50/P90 of per-interval speed (Mbps)
+    Raises the stream error if no stream received any data.
+    """
+    urls = list(url) if isinstance(url, (list, tuple)) else [url] * streams
+    buckets = int(math.ceil(max_duration / interval)) + 1
+    t0 = time.monotonic()
+    stop_at = t0 + max_duration
+
+    workers = [_Stream(u, headers, timeout, verify, chunk_size, buckets, interval, t0, stop_at, limit)
+               for u in urls]
+
+    threads = [threading.Thread(target=w.run, daemon=True) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    ok = [w for w in workers if w.total > 0]
+    if not ok:
+        raise workers[0].error or OSError("No data received")
+
+    first_byte = min(w.first_byte for w in ok)
+    last_byte = max(w.last_byte for w in ok)
+    total = sum(w.total for w in ok)
+
+    # Steady state: after every stream has ramped up, until the first stream finished
+    steady_start = max(w.first_byte for w in ok) + ramp_up
+    steady_end = min(w.last_byte for w in ok)
+    first_bucket = int(math.ceil(steady_start / interval))
+    end_bucket = int(steady_end / interval)  # Last (partial) bucket is not used
+
+    samples = []
+    for i in range(first_bucket, min(end_bucket, buckets)):
+        size = sum(w.bytes_per_bucket[i] for w in ok)
+        samples.append(_to_mbps(size, interval))
+
+    # A short or bursty transfer (slow link, few packets) leaves the steady window nearly empty
+    steady_bytes = sum(sum(w.bytes_per_bucket[i] for w in ok) for i in range(first_bucket, min(end_bucket, buckets)))
+    if len(samples) >= 2 and steady_bytes >= total * 0.25:
+        mbps = sum(samples) / len(samples)
+    else:
+        # Transfer too short for a steady state - fall back to first..last byte
+        duration = max(last_byte - first_byte, 0.001)
+        mbps = _to_mbps(total, duration)
+
+    samples.sort()
+    return {
+        'Mbps': round(mbps, 2),
+        'Bytes': total,
+        'Duration': round(last_byte - first_byte, 3),
+        'Streams': len(ok),
+        'Samples': {
+            'P10': round(_percentile(samples, 10), 2) if samples else None,
+            'P50': round(_percentile(samples, 50), 2) if samples else None,
+            'P90': round(_percentile(samples, 90), 2) if samples else None,
+        }
+    }
+
+
+def adaptive_throughput(url_for_size, streams=1, headers=None, verify=True, timeout=15,
+                        start_bytes=128 * 1024, max_bytes=100 * 1024 * 1024, target_duration=2.0,
+                        max_duration=15.0, tolerance=0.1, min_stream_bytes=1024 * 1024,
+                        range_requests=False):
+    """
+    Speed test that sizes itself: starts with a small download and grows it
+    until one transfer lasts about 'target_duration' seconds, so slow links
+    move little data and fast links are still measured long enough.
+    url_for_size(size) - URL that returns 'size' bytes (or any large file if range_requests=True,
+    then a Range header asks for the first 'size' bytes).
+    Stops when the transfer reached the target duration, when two consecutive
+    estimates differ by less than 'tolerance', at 'max_bytes' or after 'max_duration' seconds.
+    Parallel streams are only used once every stream gets at least 'min_stream_bytes'.
+    Returns the measure_throughput() result of the last round, plus:
+        Rounds - number of downloads
+        Total_Bytes - bytes downloaded by all rounds
+    """
+    deadline = time.monotonic() + max_duration
+    size = start_bytes
+    result = None
+    previous_mbps = None
+    rounds = 0
+    total_bytes = 0
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0.5 and result is not None:
+            break
+        n = max(1, min(streams, size // min_stream_bytes))
+        per_stream = size // n
+        request_headers = dict(headers or {})
+        if range_requests:
+            request_headers['Range'] = f"bytes=0-{per_stream - 1}"
+        # readinto() blocks until the buffer is full: small rounds (slow links) need small
+        # reads, otherwise all bytes arrive in a few bursts and there is nothing to time
+        chunk_size = max(4096, min(64 * 1024, per_stream // 32))
+        round_result = measure_throughput([url_for_size(per_stream)] * n, headers=request_headers,
+                                          verify=verify, timeout=timeout, chunk_size=chunk_size,
+                                          max_duration=max(remaining, 0.5), limit=per_stream)
+        rounds += 1
+        total_bytes += round_result['Bytes']
+        result = round_result
+        mbps = result['Mbps']
+
+        if result['Duration'] >= target_duration * 0.5 or size >= max_bytes:
+            break  # Long enough to trust (or as big as allowed)
+        if previous_mbps and abs(mbps - previous_mbps) <= tolerance * max(mbps, previous_mbps) \
+                and result['Duration'] >= 0.2:
+            break  # Estimate stopped changing
+
+        # Size the next round for the target duration at the current estimate,
+        # growing at least 2x (slow start makes small rounds underestimate) and at most 16x
+        bytes_per_sec = mbps * 1024 * 1024 / 8
+        wanted = int(bytes_per_sec * target_duration)
+        size = min(max(wanted, size * 2), size * 16, max_bytes)
+        previous_mbps = mbps
+
+    result['Rounds'] = rounds
+    result['Total_Bytes'] = total_bytes
+    return result
@@ -0,0 +1,222 @@
+# Local stand-ins for the external services HealthCheck talks to:
+# ip-api.com, speed.cloudflare.com (and the backup download), the Telegram Bot API
+# and the Gemini API, plus a DNS resolver on the same port number (UDP) for the
+# connectivity matrix. Used by the benchmark so it runs without the real internet.
+import json
+import math
+import re
+import socket
+import struct
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_PUBLIC_DATA = {
+    'status': 'success',
+    'country': 'Testland',
+    'regionName': 'Bench Region',
+    'city': 'Localhost',
+    'isp': 'Loopback ISP',
+    'query': '203.0.113.10',
+}
+
+FAKE_GEMINI_TEXT = "All systems look healthy. No action needed."
+
+FLOOD_RETRY_AFTER = 2  # Seconds in the 429 answer of the fake Bot API
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, rate_bytes_per_sec, latency, telegram_rate=0):
+        super().__init__(address, StandInHandler)
+        self.rate_bytes_per_sec = rate_bytes_per_sec
+        self.latency = latency  # Extra delay (seconds) before every answer
+        self.requests = {}  # Endpoint name -> number of requests
+        self.lock = threading.Lock()
+        # Bot API flood control: more than telegram_rate requests per second -> 429 with retry_after
+        self.telegram_rate = telegram_rate
+        self.telegram_times = []
+        self.telegram_blocked_until = 0.0
+        self.telegram_messages = []  # Accepted Bot API calls: (method, form fields without the document)
+
+    def count(self, endpoint):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def telegram_retry_after(self):
+        """
+        Seconds a bot has to wait (like Telegram's flood control), 0 if the request is allowed.
+        """
+        if not self.telegram_rate:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            if now < self.telegram_blocked_until:
+                return math.ceil(self.telegram_blocked_until - now)
+            self.telegram_times = [t for t in self.telegram_times if now - t < 1.0]
+            if len(self.telegram_times) >= self.telegram_rate:
+                self.telegram_blocked_until = now + FLOOD_RETRY_AFTER
+                return FLOOD_RETRY_AFTER
+            self.telegram_times.append(now)
+            return 0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real services
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_bulk(self, size, status=200):
+        """
+        Send 'size' bytes, throttled to the server rate.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        rate = self.server.rate_bytes_per_sec
+        # Slow rates get small chunks, so data arrives evenly instead of in 64 KB bursts
+        chunk = b'\x00' * (max(1460, min(65536, int(rate / 50))) if rate else 65536)
+        start = time.monotonic()
+        sent = 0
+        while sent < size:
+            n = min(len(chunk), size - sent)
+            self.wfile.write(chunk[:n])
+            sent += n
+            if rate:
+                # Sleep until the data sent so far matches the target rate
+                ahead = sent / rate - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def form_fields(self, body):
+        """
+        Text fields of an urlencoded or multipart form (file contents are left out).
+        """
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            fields = {}
+            for name, filename, value in re.findall(
+                    rb'name="([^"]+)"(; filename="[^"]*")?\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', body, re.DOTALL):
+                if not filename:
+                    fields[name.decode()] = value.decode("utf-8", "replace")
+            return fields
+        return {k: v[0] for k, v in urllib.parse.parse_qs(body.decode("utf-8", "replace")).items()}
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urllib.parse.urlparse(self.path)
+        if url.path.startswith("/json"):
+            self.server.count('ip-api')
+            self.send_json(FAKE_PUBLIC_DATA)
+        elif url.path == "/__down":
+            self.server.count('speed')
+            query = urllib.parse.parse_qs(url.query)
+            self.send_bulk(int(query.get('bytes', ['10485760'])[0]))
+        elif url.path.endswith(".zip"):
+            self.server.count('speed-backup')
+            # Honors 'Range: bytes=0-N' like the real file server
+            match = re.match(r"bytes=0-(\d+)$", self.headers.get("Range", ""))
+            if match:
+                self.send_bulk(min(int(match.group(1)) + 1, 10485760), status=206)
+            else:
+                self.send_bulk(10485760)
+        else:
+            self.send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        path = urllib.parse.urlparse(self.path).path
+
+        telegram = re.match(r"^/bot[^/]+/(sendMessage|sendDocument)$", path)
+        if telegram:
+            self.server.count(f"telegram-{telegram.group(1)}")
+            retry_after = self.server.telegram_retry_after()
+            if retry_after:
+                self.send_json({'ok': False, 'error_code': 429,
+                                'description': f"Too Many Requests: retry after {retry_after}",
+                                'parameters': {'retry_after': retry_after}}, status=429)
+                return
+            fields = self.form_fields(body)
+            text = fields.get('text', fields.get('caption', ''))
+            # Unbalanced entities are what makes real Markdown messages fail
+            if fields.get('parse_mode') == 'Markdown' and (text.count('*') % 2 or text.count('_') % 2):
+                self.send_json({'ok': False, 'error_code': 400,
+                                'description': "Bad Request: can't parse entities"}, status=400)
+                return
+            with self.server.lock:
+                self.server.telegram_messages.append((telegram.group(1), fields))
+            self.send_json({'ok': True, 'result': {'message_id': 1, 'date': int(time.time())}})
+        elif re.match(r"^/[^/]+/models/[^/]+:generateContent$", path):
+            self.server.count('gemini')
+            self.send_json({
+                'candidates': [{
+                    'content': {'role': 'model', 'parts': [{'text': FAKE_GEMINI_TEXT}]},
+                    'finishReason': 'STOP',
+                }],
+            })
+        else:
+            self.send_json({'ok': False, 'description': 'Not Found'}, status=404)
+
+
+def serve_dns(sock):
+    """
+    Answer every DNS query on 'sock' with one A record: 127.0.0.1.
+    """
+    while True:
+        try:
+            query, address = sock.recvfrom(512)
+        except OSError:
+            return  # Socket closed
+        if len(query) < 12:
+            continue
+        ident = query[:2]
+        # Header (response, recursion available, 1 question, 1 answer), the question, then the answer
+        # pointing back at the name at offset 12
+        answer = struct.pack("!HHHIH4s", 0xC00C, 1, 1, 60, 4, socket.inet_aton("127.0.0.1"))
+        header = ident + struct.pack("!HHHHH", 0x8180, 1, 1, 0, 0)
+        try:
+            sock.sendto(header + query[12:] + answer, address)
+        except OSError:
+            pass
+
+
+def start(rate_mbps=100.0, latency=0.0, host="127.0.0.1", port=0, telegram_rate=0):
+    """
+    Start all stand-ins on one local HTTP server in a background thread.
+    rate_mbps - bulk download speed limit per connection (same units as Speed_Mbps), 0 = unlimited.
+    latency - extra delay in seconds before every answer.
+    telegram_rate - Bot API requests per second before the fake Telegram answers 429, 0 = unlimited.
+    Returns the server (see base_url()); call server.shutdown() to stop it.
+    """
+    rate = rate_mbps * 1024 * 1024 / 8 if rate_mbps else 0
+    server = StandInServer((host, port), rate, latency, telegram_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    dns = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        dns.bind(server.server_address[:2])  # Same port number as the HTTP server
+        threading.Thread(target=serve_dns, args=(dns,), daemon=True).start()
+    except OSError:
+        dns.close()  # Port taken for UDP: the matrix then reports the DNS queries as failed
+    return server
+
+
+def base_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
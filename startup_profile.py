@@ -0,0 +1,125 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules whose import cost is reported
+MODULES = ['main', 'network_sender', 'monitor_sys', 'http_pool', 'daemon', 'agent']
+
+# Heavy packages that 'import main' must not load (they are imported on first use)
+LAZY = ['google.genai', 'requests', 'psutil', 'network_sender']
+
+# Targets checked with --check
+TARGET_MAIN_IMPORT_MS = 400      # import main (Flet included), warm file cache
+TARGET_FIRST_WINDOW_MS = 2500    # process start -> HealthCheckApp built (window shown)
+
+
+def import_times(module):
+    """
+    Run 'python -X importtime -c "import module"' in a fresh interpreter.
+    Returns (total ms, list of (cumulative ms, name) of its direct imports), or None on error.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=HERE, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    entries = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package", nesting shown by 2 spaces per level
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.rstrip()[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(cumulative) / 1000, depth, name.strip()))
+
+    # A package is printed after everything it imported: walk back from the module's own line
+    end = max(i for i, (_, depth, name) in enumerate(entries) if depth == 0 and name == module)
+    children = []
+    for ms, depth, name in reversed(entries[:end]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((ms, name))
+    return entries[end][0], sorted(children, reverse=True)
+
+
+def lazy_violations():
+    """
+    Heavy packages that are loaded by 'import main' anyway.
+    """
+    code = f"import sys, main; print('Loaded:' + ','.join(m for m in {LAZY!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    loaded = proc.stdout.rsplit("Loaded:", 1)[-1].strip()
+    return [m for m in loaded.split(",") if m]
+
+
+def first_window_ms(timeout=60):
+    """
+    Launch the GUI, which exits as soon as the window is built (HEALTHCHECK_STARTUP_TIMING=exit).
+    Returns wall time in ms from process start, or None if it did not start.
+    """
+    env = dict(os.environ, HEALTHCHECK_STARTUP_TIMING="exit")
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run([sys.executable, "main.py"], cwd=HERE, env=env,
+                              capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    if "Time to first window" not in proc.stdout:
+        return None
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile and time to first window")
+    parser.add_argument('--top', type=int, default=8, help="slowest imports shown per module (default: 8)")
+    parser.add_argument('--runs', type=int, default=3, help="GUI launches for the median (default: 3)")
+    parser.add_argument('--no-window', action="store_true", help="skip the GUI launch (no display)")
+    parser.add_argument('--check', action="store_true", help="exit with code 1 if a target is missed")
+    args = parser.parse_args()
+
+    failed = []
+    for module in MODULES:
+        result = import_times(module)
+        if result is None:
+            print(f"\n{module}: import failed")
+            continue
+        total, children = result
+        print(f"\n{module}: {total:.1f} ms")
+        for ms, name in children[:args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+        if module == 'main' and total > TARGET_MAIN_IMPORT_MS:
+            failed.append(f"import main {total:.0f} ms > {TARGET_MAIN_IMPORT_MS} ms")
+
+    violations = lazy_violations()
+    if violations:
+        failed.append(f"import main loads {', '.join(violations)}")
+    print(f"\nLoaded by 'import main': {', '.join(violations) if violations else 'none of ' + ', '.join(LAZY)}"
+          if violations is not None else "\nLazy import check: import main failed")
+
+    if not args.no_window:
+        times = [t for t in (first_window_ms() for _ in range(args.runs)) if t is not None]
+        if times:
+            median = statistics.median(times)
+            print(f"Time to first window: {median:.0f} ms (median of {len(times)}, target {TARGET_FIRST_WINDOW_MS} ms)")
+            if median > TARGET_FIRST_WINDOW_MS:
+                failed.append(f"first window {median:.0f} ms > {TARGET_FIRST_WINDOW_MS} ms")
+        else:
+            print("Time to first window: GUI did not start")
+            failed.append("GUI did not start")
+
+    for line in failed:
+        print(f"❌ {line}")
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
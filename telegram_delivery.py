@@ -0,0 +1,229 @@
+import io
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import http_pool
+import outbox
+
+# Telegram allows about one message per second in a chat (and bursts of a few)
+RATE = 1.0
+BURST = 3
+MAX_ATTEMPTS = 5     # Tries per request before the delivery fails
+BACKOFF = 1.0        # First retry delay in seconds, doubled every attempt
+MAX_BACKOFF = 60.0
+MAX_BATCH = 20       # Pending reports coalesced into one message + one document
+
+MESSAGE_LIMIT = 4096  # Characters of a text message
+CAPTION_LIMIT = 1024  # Characters of a document caption
+
+
+class TokenBucket:
+    """
+    Rate limiter: 'rate' requests per second on average, bursts of up to 'capacity'.
+    pause() empties the bucket for a while (Telegram's retry_after after a 429).
+    """
+
+    def __init__(self, rate=RATE, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def delay(self):
+        """
+        Seconds until a token is available (0 if one is available now).
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            return max(self.blocked_until - now, (1 - self.tokens) / self.rate, 0.0)
+
+    def acquire(self):
+        """
+        Block until a token is available, then take it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+
+class TelegramError(outbox.Rejected):
+    """
+    Telegram refused a request for good (bad token, unknown chat...), retrying will not help.
+    """
+
+
+def _response_data(resp):
+    try:
+        return resp.json()
+    except ValueError:
+        return {}
+
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class TelegramDelivery:
+    """
+    Delivery queue for one bot and chat. One background worker sends everything,
+    so all callers share one rate limit. Reports that pile up while it waits
+    (rate limit, retry_after, backoff) are coalesced into one message plus one
+    JSON document. Failed requests are retried with exponential backoff; a 429
+    pauses the whole queue for the retry_after Telegram asks for.
+    """
+
+    def __init__(self, bot_url, chat_id, encode, rate=RATE, burst=BURST, max_attempts=MAX_ATTEMPTS,
+                 backoff=BACKOFF, max_backoff=MAX_BACKOFF, max_batch=MAX_BATCH):
+        self.bot_url = bot_url  # e.g. https://api.telegram.org/bot<token>
+        self.chat_id = chat_id
+        self.encode = encode  # encode(report, name=...) -> (filename, bytes, mime), see network_sender.encode_report
+        self.bucket = TokenBucket(rate, burst)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_batch = max_batch
+        self.pending = []  # (text, reports, markdown, fallback, future)
+        self.cond = threading.Condition()
+        self.worker = None
+        self.stats = {'Requests': 0, 'Retries': 0, 'Flood_Waits': 0, 'Coalesced': 0}
+
+    def submit(self, text, reports, markdown=True, fallback=True):
+        """
+        Queue one message with its report(s) (list). Returns a Future with True
+        once Telegram accepted it, False if it finally failed, or TelegramError
+        as its exception if Telegram refused it for good.
+        fallback - on failure the reports go to the outbox, so they are sent later
+        (refused ones are set aside there as '.rejected', see outbox.reject).
+        """
+        future = Future()
+        with self.cond:
+            self.pending.append((text, list(reports), markdown, fallback, future))
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, name="telegram", daemon=True)
+                self.worker.start()
+            self.cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.pending and not self.cond.wait_for(lambda: self.pending, timeout=60):
+                    self.worker = None
+                    return  # Idle: the next submit() starts a new worker
+            # Whatever arrives while we wait for the rate limit is sent together
+            time.sleep(self.bucket.delay())
+            with self.cond:
+                batch = self.pending[:self.max_batch]
+                del self.pending[:self.max_batch]
+
+            error = None
+            try:
+                ok = self._deliver(batch)
+            except Exception as e:
+                print(f"Telegram Error: {e}")
+                ok = False
+                if isinstance(e, TelegramError):
+                    error = e  # Retrying later would fail the same way
+            for text, reports, markdown, fallback, future in batch:
+                if not ok and fallback:
+                    for report in reports:
+                        if error is None:
+                            outbox.enqueue(report)
+                        else:
+                            outbox.reject(report)
+                if error is None:
+                    future.set_result(ok)
+                else:
+                    future.set_exception(error)
+
+    def _deliver(self, batch):
+        """
+        One message (or caption) plus one document for all items of the batch.
+        """
+        if len(batch) == 1:
+            text, reports, markdown, _, _ = batch[0]
+            document = reports[0] if len(reports) == 1 else reports
+            name = "report" if len(reports) == 1 else "reports"
+        else:
+            self.stats['Coalesced'] += len(batch)
+            text = f"📦 {len(batch)} reports\n\n" + "\n\n—————\n\n".join(item[0] for item in batch)
+            markdown = False  # Parts written for Markdown may not parse once joined
+            document = [report for item in batch for report in item[1]]
+            name = "reports"
+
+        filename, payload, mime = self.encode(document, name=name)
+        fields = {"chat_id": self.chat_id}
+        if markdown:
+            fields["parse_mode"] = "Markdown"
+
+        if len(text) <= CAPTION_LIMIT:
+            # Short text: one request, the text is the caption of the document
+            return self._request("sendDocument", dict(fields, caption=text), (filename, payload, mime))
+        if not self._request("sendMessage", dict(fields, text=_truncate(text, MESSAGE_LIMIT))):
+            return False
+        return self._request("sendDocument", {"chat_id": self.chat_id}, (filename, payload, mime))
+
+    def _request(self, method, data, document=None):
+        """
+        POST to the Bot API, honoring the rate limit. Returns True on success.
+        """
+        url = f"{self.bot_url}/{method}"
+        data = dict(data)
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.stats['Retries'] += 1
+            self.bucket.acquire()
+            self.stats['Requests'] += 1
+            files = None
+            if document is not None:
+                filename, payload, mime = document
+                files = {"document": (filename, io.BytesIO(payload), mime)}  # New stream every attempt
+            try:
+                resp = http_pool.post(url, data=data, files=files)
+            except Exception as e:
+                print(f"Telegram Error ({method}): {e}")
+            else:
+                body = _response_data(resp)
+                if resp.status_code == 200 and body.get('ok'):
+                    return True
+                description = body.get('description', resp.reason)
+                if resp.status_code == 429:
+                    # Flood control: wait exactly as long as Telegram says, for every request of the queue
+                    retry_after = (body.get('parameters') or {}).get('retry_after') \
+                        or resp.headers.get('Retry-After') or self.backoff * 2 ** attempt
+                    self.stats['Flood_Waits'] += 1
+                    self.bucket.pause(float(retry_after))
+                    continue
+                if resp.status_code == 400 and "parse" in description.lower() and "parse_mode" in data:
+                    # Gemini text is not always valid Markdown - send it as plain text
+                    data.pop("parse_mode")
+                    continue
+                if resp.status_code < 500:
+                    raise TelegramError(f"{method}: {resp.status_code} {description}")
+                print(f"Telegram Error ({method}): {resp.status_code} {description}")
+            # Network error or 5xx: exponential backoff with jitter, so many agents do not retry in step
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+        return False
@@ -0,0 +1,56 @@
+# Telegram delivery queue against the fake Bot API of standins (flood control included).
+# Run: python -m unittest test_telegram_delivery
+import json
+import unittest
+
+import standins
+import telegram_delivery
+
+
+def encode(report, name="report"):
+    return f"{name}.json", json.dumps(report).encode(), "application/json"
+
+
+class TelegramDeliveryTest(unittest.TestCase):
+
+    def setUp(self):
+        # One request per second, like a real chat: a burst runs into 429 / retry_after
+        self.server = standins.start(telegram_rate=1)
+        # The client thinks it may send faster than that, so it only learns the limit from the 429s
+        self.delivery = telegram_delivery.TelegramDelivery(
+            f"{standins.base_url(self.server)}/botTEST", "42", encode, rate=10, burst=10, backoff=0.1)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def telegram_requests(self):
+        return sum(n for name, n in self.server.requests.items() if name.startswith("telegram-"))
+
+    def test_burst_is_coalesced_without_losses(self):
+        count = 12
+        first = self.delivery.submit("Report 0", [{'Id': 0}], markdown=False, fallback=False)
+        self.assertTrue(first.result(timeout=30))
+        # Second request within the same second: 429, and the rest piles up during retry_after
+        futures = [self.delivery.submit(f"Report {i}", [{'Id': i}], markdown=False, fallback=False)
+                   for i in range(1, count)]
+        self.assertTrue(all(f.result(timeout=60) for f in futures))  # No report lost
+
+        self.assertLess(self.telegram_requests(), count)
+        self.assertGreater(self.delivery.stats['Coalesced'], 0)
+        self.assertGreater(self.delivery.stats['Flood_Waits'], 0)  # 429 seen and retry_after honored
+        accepted = "\n".join(fields.get('text', fields.get('caption', ''))
+                             for _, fields in self.server.telegram_messages)
+        for i in range(count):
+            self.assertIn(f"Report {i}", accepted)
+
+    def test_invalid_markdown_is_sent_as_plain_text(self):
+        future = self.delivery.submit("*unbalanced", [{'Id': 1}], fallback=False)
+        self.assertTrue(future.result(timeout=30))
+        method, fields = self.server.telegram_messages[-1]
+        self.assertEqual(fields['caption'], "*unbalanced")
+        self.assertNotIn('parse_mode', fields)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,267 @@
+import functools
+import json
+import os
+import socket
+import threading
+import time
+
+# Where finished traces go (both optional, nothing is exported by default):
+# OTLP/HTTP collector, e.g. http://localhost:4318 (standard OpenTelemetry variable)
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+# File that gets one OTLP-JSON document per line
+TRACE_FILE = os.getenv("HEALTHCHECK_TRACE_FILE")
+
+SERVICE_NAME = "healthcheck"
+
+OK = 'ok'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+SKIPPED = 'skipped'
+
+_local = threading.local()
+
+
+def _outcome_for(exc):
+    """
+    'timeout' for socket/requests timeouts, 'error' for everything else.
+    """
+    if isinstance(exc, TimeoutError) or 'Timeout' in type(exc).__name__:
+        return TIMEOUT
+    return ERROR
+
+
+class Span:
+    """
+    One timed operation: monotonic duration, outcome ('ok', 'error', 'timeout',
+    'skipped') and error class. Used as a context manager it becomes the current
+    span of the thread, so nested spans and note_error() attach to it.
+    An exception leaving the 'with' block marks the span as failed and is re-raised.
+    """
+
+    def __init__(self, name, trace=None, parent=None):
+        self.name = name
+        self.trace = trace
+        self.parent = parent
+        self.span_id = os.urandom(8).hex()
+        self.start_ns = time.time_ns()  # Wall clock, only for the export
+        self.start = time.perf_counter()
+        self.duration = None
+        self.outcome = OK
+        self.error = None
+        self._previous = None
+
+    def note_error(self, exc, outcome=None):
+        """
+        Mark the span as failed without raising (for errors that are handled).
+        """
+        if self.duration is None:
+            self.outcome = outcome or _outcome_for(exc)
+            self.error = exc if isinstance(exc, str) else type(exc).__name__
+
+    def finish(self, outcome=None, error=None):
+        if self.duration is not None:
+            return  # Already finished (e.g. timed out by the probe engine)
+        self.duration = time.perf_counter() - self.start
+        if outcome is not None:
+            self.outcome = outcome
+        if error is not None:
+            self.error = error
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'span', None)
+        _local.span = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.span = self._previous
+        if exc is not None:
+            self.note_error(exc)
+        self.finish()
+        return False
+
+    @property
+    def duration_ms(self):
+        duration = self.duration if self.duration is not None else time.perf_counter() - self.start
+        return round(duration * 1000, 1)
+
+    def to_dict(self):
+        result = {'Duration_ms': self.duration_ms, 'Outcome': self.outcome}
+        if self.error:
+            result['Error'] = self.error
+        return result
+
+
+class Trace:
+    """
+    All spans of one health check (one quickcheck() run).
+    """
+
+    def __init__(self, name):
+        self.trace_id = os.urandom(16).hex()
+        self.lock = threading.Lock()
+        self.spans = []
+        self.root = self.span(name, parent=False)
+
+    def span(self, name, parent=None):
+        """
+        New span, child of 'parent' (default: the root span).
+        """
+        if parent is None:
+            parent = self.root
+        span = Span(name, self, parent or None)
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    def skipped(self, name, error=None):
+        span = self.span(name)
+        span.finish(outcome=SKIPPED, error=error)
+        return span
+
+    def finish(self):
+        self.root.finish()
+
+    def timings(self):
+        """
+        The 'Timings' section of the report: total time, slowest probe and every span.
+        Probes are direct children of the root, deeper spans are keyed 'probe.step'
+        (a span named 'latency' inside 'speed' is 'speed.latency'); a repeated key
+        gets '#2', '#3'... so no span hides another.
+        """
+        with self.lock:
+            spans = [s for s in self.spans if s is not self.root]
+        probes = [s for s in spans if s.parent is self.root and s.outcome != SKIPPED]
+        slowest = max(probes, key=lambda s: s.duration_ms, default=None)
+        keys = {}
+        timings = {}
+        for span in spans:  # Parents are created before their children
+            parent = keys.get(id(span.parent))
+            key = span.name
+            if parent is not None and not key.startswith(parent + '.'):
+                key = f"{parent}.{key}"
+            unique, n = key, 1
+            while unique in timings:
+                n += 1
+                unique = f"{key}#{n}"
+            keys[id(span)] = unique
+            timings[unique] = span.to_dict()
+        return {
+            'Total_ms': self.root.duration_ms,
+            'Slowest': slowest.name if slowest else None,
+            'Probes': timings,
+        }
+
+
+def current_span():
+    return getattr(_local, 'span', None)
+
+
+def span(name):
+    """
+    Context manager: child of the current span of this thread.
+    Outside a trace it is a standalone span that is only timed, not recorded.
+    """
+    parent = current_span()
+    if parent is None or parent.trace is None:
+        return Span(name)
+    return parent.trace.span(name, parent)
+
+
+def traced(name=None):
+    """
+    Decorator: run the function inside span(name) (default: function name).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def note_error(exc):
+    """
+    Record a handled exception on the current span (for 'except' blocks that
+    return a fallback value instead of raising).
+    """
+    current = current_span()
+    if current is not None:
+        current.note_error(exc)
+
+
+def activate(span_, func, *args):
+    """
+    Run func(*args) with span_ as the current span (in a worker thread).
+    The span is not finished here - whoever created it does that.
+    """
+    previous = current_span()
+    _local.span = span_
+    try:
+        return func(*args)
+    finally:
+        _local.span = previous
+
+
+def _attribute(key, value):
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def to_otlp(trace):
+    """
+    Trace in the OTLP/JSON encoding of OpenTelemetry (ExportTraceServiceRequest).
+    """
+    with trace.lock:
+        spans = list(trace.spans)
+    otlp_spans = []
+    for s in spans:
+        duration_ns = int(s.duration_ms * 1e6)
+        item = {
+            'traceId': trace.trace_id,
+            'spanId': s.span_id,
+            'name': s.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(s.start_ns),
+            'endTimeUnixNano': str(s.start_ns + duration_ns),
+            'attributes': [_attribute('healthcheck.outcome', s.outcome)],
+            # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2 (skipped probes stay UNSET = 0)
+            'status': {'code': 0 if s.outcome == SKIPPED else 1 if s.outcome == OK else 2},
+        }
+        if s.parent is not None:
+            item['parentSpanId'] = s.parent.span_id
+        if s.error:
+            item['attributes'].append(_attribute('error.type', s.error))
+            item['status']['message'] = s.error
+        otlp_spans.append(item)
+
+    return {'resourceSpans': [{
+        'resource': {'attributes': [_attribute('service.name', SERVICE_NAME),
+                                    _attribute('host.name', socket.gethostname())]},
+        'scopeSpans': [{'scope': {'name': 'healthcheck.tracing'}, 'spans': otlp_spans}],
+    }]}
+
+
+def _send(document):
+    if TRACE_FILE:
+        try:
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(document) + "\n")
+        except OSError as e:
+            print(f"Trace Export Error: {e}")
+    if OTLP_ENDPOINT:
+        import http_pool
+        try:
+            with http_pool.post(OTLP_ENDPOINT.rstrip("/") + "/v1/traces", json=document, timeout=5) as resp:
+                resp.raise_for_status()
+        except Exception as e:
+            print(f"Trace Export Error: {e}")
+
+
+def export(trace):
+    """
+    Send a finished trace to TRACE_FILE and/or the OTLP collector, in the background.
+    Does nothing if neither is configured.
+    """
+    if not (TRACE_FILE or OTLP_ENDPOINT):
+        return
+    threading.Thread(target=_send, args=(to_otlp(trace),), daemon=True).start()
@@ -0,0 +1,332 @@
+import argparse
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+# Where history is kept (shared with other on-disk data of the app)
+DATA_DIR = os.getenv("HEALTHCHECK_DATA_DIR", os.path.join(os.path.expanduser('~'), '.healthcheck'))
+# A series has exactly one writer process: the daemon keeps its store open in HISTORY_DIR,
+# manual (GUI) checks write their own store, so neither overwrites the other's records
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+GUI_HISTORY_DIR = os.path.join(DATA_DIR, "history_gui")
+
+# Numeric fields kept from every report
+FIELDS = ('RAM_Percent', 'Disk_Percent', 'Ping', 'Speed_Mbps', 'Gateway_Status')
+
+# Record: timestamp (double), number of samples (uint32), one float32 per field (NaN = no value)
+RECORD = struct.Struct("<dI" + "f" * len(FIELDS))
+# Header: magic, version, record size, tier step (seconds), number of records
+HEADER = struct.Struct("<4sHHIQ")
+HEADER_SIZE = 64
+MAGIC = b"HCTS"
+VERSION = 1
+GROW_RECORDS = 65536  # File grows in steps of this many records (2 MB)
+
+DAY = 86400
+# Tiers: name, bucket size in seconds (0 = raw, one record per sample), retention in seconds.
+# Records older than the retention are dropped when a file would grow, so each file stays
+# below (records in the retention window + GROW_RECORDS) * RECORD.size. With the daemon's
+# one sample per second that is about 21 MB (raw), 6 MB (1m) and 2 MB (1h, never grows).
+TIERS = (('raw', 0, 7 * DAY), ('1m', 60, 90 * DAY), ('1h', 3600, 2 * 365 * DAY))
+
+
+class Series:
+    """
+    One append-only file of fixed-width records in a memory-mapped file.
+    Records are sorted by time, so range queries are a binary search plus a slice.
+    Only one process may write to a series (see HISTORY_DIR / GUI_HISTORY_DIR): the record
+    count lives in memory, so a second writer would overwrite records.
+    retention - seconds of records to keep (None = forever); older records are
+    dropped instead of growing the file (see _compact).
+    """
+
+    def __init__(self, path, step, retention=None):
+        self.path = path
+        self.step = step
+        self.retention = retention
+        self.lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        new = not os.path.exists(self.path)
+        self.file = open(self.path, "r+b" if not new else "w+b")
+        if new:
+            self.file.truncate(HEADER_SIZE + GROW_RECORDS * RECORD.size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        if new:
+            self._write_count(0)
+        magic, version, record_size, step_on_disk, count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{self.path} is not a HealthCheck history file (or has another version)")
+        self.count = count
+
+    def _write_count(self, count):
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, RECORD.size, self.step, count)
+
+    def _grow(self):
+        size = len(self.map) + GROW_RECORDS * RECORD.size
+        self.map.close()
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+    def _compact(self, cutoff):
+        """
+        Drop the records before cutoff. The kept records are written to a new file of the
+        same size, which then replaces this one, so a crash leaves either file complete.
+        Returns the number of dropped records. Caller holds the lock.
+        """
+        first = self.find(cutoff)
+        if not first:
+            return 0
+        count = self.count - first
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w+b") as f:
+            f.truncate(len(self.map))
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, self.step, count))
+            f.seek(HEADER_SIZE)
+            f.write(self.map[HEADER_SIZE + first * RECORD.size:HEADER_SIZE + self.count * RECORD.size])
+            f.flush()
+            os.fsync(f.fileno())
+        self.map.close()
+        self.file.close()
+        os.replace(tmp, self.path)
+        self._open()
+        return first
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, values, samples=1):
+        """
+        values - sequence of floats in FIELDS order (NaN for missing).
+        Timestamps never go backwards: an older one is moved to the last record's time.
+        """
+        with self.lock:
+            if self.count:
+                timestamp = max(timestamp, self.time_at(self.count - 1))
+            offset = HEADER_SIZE + self.count * RECORD.size
+            if offset + RECORD.size > len(self.map):
+                # File full: make room by dropping expired records. Grow if that frees
+                # too little, so the file is not rewritten for every few new records.
+                dropped = self._compact(timestamp - self.retention) if self.retention is not None else 0
+                if dropped < GROW_RECORDS // 4:
+                    self._grow()
+                offset = HEADER_SIZE + self.count * RECORD.size
+            RECORD.pack_into(self.map, offset, timestamp, samples, *values)
+            # Record first, then the count: a crash never exposes a half-written record
+            self.count += 1
+            self._write_count(self.count)
+
+    def time_at(self, index):
+        return struct.unpack_from("<d", self.map, HEADER_SIZE + index * RECORD.size)[0]
+
+    def find(self, timestamp):
+        """
+        Index of the first record at or after timestamp.
+        """
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.time_at(mid) < timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def count_range(self, start, end):
+        with self.lock:
+            return self.find(end) - self.find(start)
+
+    def range(self, start, end):
+        """
+        Records with start <= time < end as (timestamp, samples, values) tuples.
+        """
+        with self.lock:
+            first, last = self.find(start), self.find(end)
+            data = self.map[HEADER_SIZE + first * RECORD.size:HEADER_SIZE + last * RECORD.size]
+        return [(r[0], r[1], r[2:]) for r in RECORD.iter_unpack(data)]
+
+    def close(self):
+        with self.lock:
+            self.map.flush()
+            self.map.close()
+            self.file.close()
+
+
+class _Bucket:
+    """
+    Running NaN-aware sums of one rollup bucket.
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.samples = 0
+        self.sums = [0.0] * len(FIELDS)
+        self.counts = [0] * len(FIELDS)
+
+    def add(self, values, samples=1):
+        self.samples += samples
+        for i, value in enumerate(values):
+            if not math.isnan(value):
+                self.sums[i] += value * samples
+                self.counts[i] += samples
+
+    def averages(self):
+        return [self.sums[i] / self.counts[i] if self.counts[i] else math.nan for i in range(len(FIELDS))]
+
+
+class TimeSeriesStore:
+    """
+    Report history: raw records plus automatic 1-minute and 1-hour rollups (averages).
+    A rollup record is written when its bucket is complete, i.e. when the first
+    sample of the next bucket arrives. Every tier keeps its retention (see TIERS).
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or HISTORY_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.series = {name: Series(os.path.join(self.directory, f"{name}.hcts"), step, retention)
+                       for name, step, retention in TIERS}
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self._restore_buckets()
+
+    def _restore_buckets(self):
+        """
+        After a restart, rebuild the unfinished rollup buckets from the raw tail.
+        """
+        raw = self.series['raw']
+        if not len(raw):
+            return
+        last = raw.time_at(len(raw) - 1)
+        for name, step, _ in TIERS[1:]:
+            start = last - last % step
+            series = self.series[name]
+            if len(series) and series.time_at(len(series) - 1) >= start:
+                continue  # Already flushed
+            bucket = _Bucket(start)
+            for _, samples, values in raw.range(start, start + step):
+                bucket.add(values, samples)
+            self.buckets[name] = bucket
+
+    def append(self, values, timestamp=None):
+        """
+        values - dict with some of FIELDS (missing or None = no value).
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        row = [math.nan if values.get(name) is None else float(values[name]) for name in FIELDS]
+        with self.lock:
+            self.series['raw'].append(timestamp, row)
+            for name, step, _ in TIERS[1:]:
+                start = timestamp - timestamp % step
+                bucket = self.buckets.get(name)
+                if bucket is not None and bucket.start < start:
+                    # Bucket complete - write its averages
+                    self.series[name].append(bucket.start, bucket.averages(), bucket.samples)
+                    bucket = None
+                if bucket is None:
+                    bucket = self.buckets[name] = _Bucket(start)
+                bucket.add(row)
+
+    def query(self, start, end=None, tier=None, max_points=2000):
+        """
+        Records between start and end (Unix time) as list of dicts.
+        tier - 'raw', '1m' or '1h'; by default the finest tier that still covers
+        the range (retention) and gives at most max_points points for it.
+        """
+        end = time.time() if end is None else end
+        if tier is None:
+            oldest = time.time() - start
+            for tier, _, retention in TIERS:
+                if oldest <= retention and self.series[tier].count_range(start, end) <= max_points:
+                    break
+        rows = []
+        for timestamp, samples, values in self.series[tier].range(start, end):
+            row = {'Time': timestamp, 'Samples': samples}
+            row.update({name: None if math.isnan(v) else round(v, 2) for name, v in zip(FIELDS, values)})
+            rows.append(row)
+        return rows
+
+    def close(self):
+        for series in self.series.values():
+            series.close()
+
+
+def values_from_report(report):
+    """
+    Numeric fields of a quickcheck() report for the store.
+    """
+    network = report.get('Network') or {}
+    speed = network.get('Speed') or {}
+
+    def number(value):
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+    gateway = network.get('Gateway_Status')
+    return {
+        'RAM_Percent': number((report.get('RAM') or {}).get('Percent')),
+        'Disk_Percent': number((report.get('Disk') or {}).get('Percent')),
+        'Ping': number(speed.get('Ping')),
+        'Speed_Mbps': number(speed.get('Speed_Mbps')),
+        # True/False when the gateway was checked, 'No Need' when online (gateway obviously works)
+        'Gateway_Status': 1.0 if gateway in (True, 'No Need') else 0.0 if gateway is False else None,
+    }
+
+
+_stores = {}
+_store_lock = threading.Lock()
+
+
+def get_store(directory=None):
+    """
+    Store in 'directory' (default HISTORY_DIR), opened on first use.
+    """
+    directory = directory or HISTORY_DIR
+    with _store_lock:
+        if directory not in _stores:
+            _stores[directory] = TimeSeriesStore(directory)
+        return _stores[directory]
+
+
+def append_report(report, timestamp=None, directory=None):
+    get_store(directory).append(values_from_report(report), timestamp)
+
+
+def parse_age(text):
+    """
+    '90s', '15m', '24h', '30d' -> seconds.
+    """
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query HealthCheck report history")
+    parser.add_argument('--since', default="24h", help="how far back, e.g. 90m, 24h, 30d (default: 24h)")
+    parser.add_argument('--tier', choices=[name for name, _, _ in TIERS], help="resolution (default: automatic)")
+    parser.add_argument('--dir', help="history directory (default: ~/.healthcheck/history)")
+    parser.add_argument('--gui', action='store_true', help="history of manual checks (~/.healthcheck/history_gui)")
+    args = parser.parse_args()
+
+    store = TimeSeriesStore(args.dir or (GUI_HISTORY_DIR if args.gui else None))
+    start = time.time() - parse_age(args.since)
+    query_start = time.perf_counter()
+    rows = store.query(start, tier=args.tier)
+    elapsed = (time.perf_counter() - query_start) * 1000
+
+    print(f"{'Time':<20}{'Samples':>8}" + "".join(f"{name:>16}" for name in FIELDS))
+    for row in rows:
+        print(f"{datetime.fromtimestamp(row['Time']).strftime('%Y-%m-%d %H:%M:%S'):<20}{row['Samples']:>8}"
+              + "".join(f"{'-' if row[name] is None else row[name]:>16}" for name in FIELDS))
+    print(f"{len(rows)} records in {elapsed:.2f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe memoizing cache.
+    Every key has its own time-to-live, and the number of keys is bounded
+    (least recently used keys are dropped first).
+    """
+
+    def __init__(self, maxsize=128, default_ttl=300):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.data = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.network = _MISSING  # Last seen network fingerprint
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return default
+            if item[0] <= time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def get_or_compute(self, key, func, ttl=None, cache_none=False):
+        """
+        Return cached value for key, or call func() and cache its result.
+        None results (failed lookups) are not cached unless cache_none is True.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = func()
+        if value is not None or cache_none:
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def note_network(self, fingerprint):
+        """
+        Tell the cache which network we are on (e.g. local IP).
+        If it changed since the last call, every entry is dropped,
+        because public IP, gateway etc. are probably different now.
+        Returns True if the cache was cleared.
+        """
+        with self.lock:
+            changed = self.network is not _MISSING and fingerprint != self.network
+            self.network = fingerprint
+            if changed:
+                self.data.clear()
+            return changed
+
+
+def cached(cache, ttl=None, cache_none=False):
+    """
+    Decorator: memoize function results in cache.
+    The key is the function name plus its arguments.
+    The original function stays available as func.uncached.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            return cache.get_or_compute(key, lambda: func(*args, **kwargs), ttl, cache_none)
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+
+import psutil
+
+# Filesystems that are not storage (kernel, memory, containers, snap images)
+PSEUDO_FSTYPES = {
+    'proc', 'sysfs', 'devtmpfs', 'devpts', 'tmpfs', 'ramfs', 'cgroup', 'cgroup2', 'securityfs',
+    'pstore', 'debugfs', 'tracefs', 'configfs', 'fusectl', 'mqueue', 'hugetlbfs', 'bpf',
+    'binfmt_misc', 'autofs', 'rpc_pipefs', 'nsfs', 'efivarfs', 'squashfs', 'overlay', 'aufs',
+    'devfs', 'nullfs', 'fdescfs', 'selinuxfs',
+}
+# Mount points below these are system internals, not user storage
+PSEUDO_PREFIXES = ('/proc', '/sys', '/dev', '/run', '/snap', '/var/lib/docker',
+                   '/System/Volumes/VM', '/System/Volumes/Preboot', '/System/Volumes/Update',
+                   '/System/Volumes/xarts', '/System/Volumes/iSCPreboot', '/System/Volumes/Hardware')
+# Network filesystems (the usual suspects for hanging statvfs calls)
+NETWORK_FSTYPES = {'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'afpfs', 'sshfs', 'fuse.sshfs', 'webdav', '9p'}
+
+# disk_io_counters() field -> report field
+IO_COUNTERS = {
+    'read_bytes': 'Read_Bytes_Sec',
+    'write_bytes': 'Write_Bytes_Sec',
+    'read_count': 'Read_Ops_Sec',
+    'write_count': 'Write_Ops_Sec',
+}
+
+STAT_TIMEOUT = 2.0  # Seconds one mount may take before it is reported as hung
+
+# Mount point -> thread of a statvfs call that never returned. A hung mount
+# gets no new thread until the old one finishes, so threads do not pile up.
+_stuck = {}
+_stuck_lock = threading.Lock()
+
+
+def list_mounts():
+    """
+    Real storage mounts from psutil.disk_partitions(all=True), pseudo filesystems skipped.
+    The root filesystem is always kept (in containers it is often 'overlay').
+    Bind mounts of the same device are listed once (shortest mount point).
+    """
+    mounts = {}
+    for part in psutil.disk_partitions(all=True):
+        mountpoint = part.mountpoint
+        is_root = mountpoint in ('/', 'C:\\')
+        if not is_root:
+            if part.fstype in PSEUDO_FSTYPES or not part.fstype:
+                continue
+            if any(mountpoint == p or mountpoint.startswith(p + '/') for p in PSEUDO_PREFIXES):
+                continue
+            if 'cdrom' in part.opts:
+                continue  # Windows drive without a disc
+        key = part.device if part.device.startswith(('/dev/', '\\\\')) or ':' in part.device else mountpoint
+        known = mounts.get(key)
+        if known is None or len(mountpoint) < len(known.mountpoint):
+            mounts[key] = part
+    return sorted(mounts.values(), key=lambda p: p.mountpoint)
+
+
+def _stat(mountpoint):
+    """
+    One syscall per mount: statvfs (space and inodes) on POSIX, GetDiskFreeSpaceEx on Windows.
+    """
+    if hasattr(os, 'statvfs'):
+        st = os.statvfs(mountpoint)
+        total = st.f_blocks * st.f_frsize
+        free = st.f_bfree * st.f_frsize
+        avail = st.f_bavail * st.f_frsize
+        used = total - free
+        # Same percent as psutil/df: space reserved for root is not available to users
+        percent = used / (used + avail) * 100 if used + avail else 0
+        inodes = None
+        if st.f_files:
+            inodes = round((st.f_files - st.f_ffree) / st.f_files * 100, 1)
+        return total, used, percent, inodes
+    usage = psutil.disk_usage(mountpoint)
+    return usage.total, usage.used, usage.percent, None
+
+
+def _volume(part, stat):
+    total, used, percent, inodes = stat
+    return {
+        'Mount': part.mountpoint,
+        'Device': part.device,
+        'FS': part.fstype,
+        'Total': round(total / (1024 ** 3), 1),
+        'Used': round(used / (1024 ** 3), 1),
+        'Percent': int(percent),
+        'Inodes_Percent': inodes,
+        'Network': part.fstype in NETWORK_FSTYPES,
+        'Status': 'ok',
+    }
+
+
+def get_volumes(timeout=STAT_TIMEOUT):
+    """
+    Usage of every real mount. All mounts are queried at the same time in
+    daemon threads, so a hung network mount costs at most 'timeout' seconds
+    and is reported with Status 'timeout' instead of blocking the report.
+    """
+    parts = list_mounts()
+    boxes = {}
+    threads = {}
+    for part in parts:
+        with _stuck_lock:
+            stuck = _stuck.get(part.mountpoint)
+            if stuck is not None and stuck.is_alive():
+                continue  # Still hanging since an earlier report
+            _stuck.pop(part.mountpoint, None)
+        box = boxes[part.mountpoint] = {}
+
+        def run(mountpoint=part.mountpoint, box=box):
+            try:
+                box['stat'] = _stat(mountpoint)
+            except OSError as e:
+                box['error'] = type(e).__name__
+
+        thread = threads[part.mountpoint] = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+    deadline = time.monotonic() + timeout
+    volumes = []
+    for part in parts:
+        thread = threads.get(part.mountpoint)
+        if thread is not None:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        box = boxes.get(part.mountpoint, {})
+        if 'stat' in box:
+            volumes.append(_volume(part, box['stat']))
+            continue
+        status = 'error' if 'error' in box else 'timeout'
+        if status == 'timeout' and thread is not None:
+            with _stuck_lock:
+                _stuck[part.mountpoint] = thread
+        volumes.append({'Mount': part.mountpoint, 'Device': part.device, 'FS': part.fstype,
+                        'Network': part.fstype in NETWORK_FSTYPES, 'Status': status, 'Error': box.get('error')})
+    return volumes
+
+
+class DiskRates:
+    """
+    Read/write throughput from the difference of two psutil.disk_io_counters() samples
+    (same idea as net_metrics.InterfaceRates).
+    """
+
+    def __init__(self):
+        self.last_time = None
+        self.last_counters = None
+
+    def sample(self):
+        """
+        Returns rates since the previous sample (empty dict on the first call).
+        """
+        now = time.monotonic()
+        counters = psutil.disk_io_counters()
+        rates = {}
+        if counters is not None and self.last_counters is not None:
+            elapsed = now - self.last_time
+            if elapsed > 0:
+                rates = {
+                    field: round(max(0, getattr(counters, name) - getattr(self.last_counters, name)) / elapsed, 1)
+                    for name, field in IO_COUNTERS.items()
+                }
+                # Linux only: share of the time the disks were busy
+                if hasattr(counters, 'busy_time'):
+                    busy_ms = max(0, counters.busy_time - self.last_counters.busy_time)
+                    rates['Busy_Percent'] = round(min(100.0, busy_ms / 10 / elapsed), 1)
+        self.last_time = now
+        self.last_counters = counters
+        return rates
+
+
+def measure_io(interval=1.0):
+    """
+    Disk throughput over the next 'interval' seconds.
+    """
+    sampler = DiskRates()
+    sampler.sample()
+    time.sleep(interval)
+    return sampler.sample()
@@ -0,0 +1,250 @@
+import struct
+import time
+from datetime import datetime
+
+# Compact binary encoding of quickcheck() reports for agent -> collector streaming.
+#
+# Frame on the wire:  uint32 length | payload
+# Payload:            uint8 version | uint8 kind | uint16 seq | uint32 unix time | uint64 field mask | values
+# 'kind' is FULL (all fields, a keyframe) or DELTA (only fields that changed since the previous frame).
+# Every bit of the mask is one entry of FIELDS; values follow in FIELDS order, each as a tag byte + data.
+# Fields that are not in FIELDS (e.g. raw latency samples) are not sent.
+
+SCHEMA_VERSION = 1
+
+FULL = 0
+DELTA = 1
+
+# Changing this list means a new SCHEMA_VERSION (append only, max 64 fields)
+FIELDS = [
+    ('Hostname',),
+    ('OS',),
+    ('Uptime', 'Hours'),
+    ('Uptime', 'Days'),
+    ('Disk', 'Total'),
+    ('Disk', 'Used'),
+    ('Disk', 'Percent'),
+    ('RAM', 'Total'),
+    ('RAM', 'Used'),
+    ('RAM', 'Percent'),
+    ('Network', 'Status'),
+    ('Network', 'IP'),
+    ('Network', 'Interface'),
+    ('Network', 'DHCP'),
+    ('Network', 'Gateway'),
+    ('Network', 'Gateway_Status'),
+    ('Network', 'Public_IP'),
+    ('Network', 'Location'),
+    ('Network', 'ISP'),
+    ('Network', 'Speed', 'Ping'),
+    ('Network', 'Speed', 'Speed_Mbps'),
+    ('Network', 'Traffic', 'Bytes_Sent_Sec'),
+    ('Network', 'Traffic', 'Bytes_Recv_Sec'),
+    ('Network', 'Traffic', 'Errors_In_Sec'),
+    ('Network', 'Traffic', 'Errors_Out_Sec'),
+]
+
+HEADER = struct.Struct("!BBHIQ")
+LENGTH = struct.Struct("!I")
+# Largest payload a reader accepts. A real frame is at most a few KB; the limit keeps a
+# corrupt or hostile length prefix from making the reader allocate gigabytes.
+MAX_FRAME = 16 * 1024 * 1024
+
+# Value tags
+T_NONE, T_FALSE, T_TRUE, T_INT8, T_INT32, T_FLOAT32, T_STR, T_FLOAT64, T_ABSENT = range(9)
+
+_MISSING = object()
+
+
+class WireError(ValueError):
+    pass
+
+
+def flatten(report):
+    """
+    Report dict -> {field index: value} for the fields in FIELDS.
+    """
+    flat = {}
+    for i, path in enumerate(FIELDS):
+        node = report
+        for key in path:
+            node = node.get(key, _MISSING) if isinstance(node, dict) else _MISSING
+        if node is not _MISSING:
+            flat[i] = node
+    return flat
+
+
+def unflatten(flat, timestamp):
+    report = {'Time': datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")}
+    for i, value in sorted(flat.items()):
+        node = report
+        path = FIELDS[i]
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return report
+
+
+def _pack_value(value):
+    if value is _MISSING:
+        return bytes([T_ABSENT])
+    if value is None:
+        return bytes([T_NONE])
+    if value is True:
+        return bytes([T_TRUE])
+    if value is False:
+        return bytes([T_FALSE])
+    if isinstance(value, int):
+        if -128 <= value <= 127:
+            return struct.pack("!Bb", T_INT8, value)
+        if -2**31 <= value < 2**31:
+            return struct.pack("!Bi", T_INT32, value)
+        return struct.pack("!Bd", T_FLOAT64, value)
+    if isinstance(value, float):
+        # float32 keeps ~7 significant digits - enough for percents, GB and Mbps
+        if value == 0 or 1e-3 <= abs(value) < 1e7:
+            return struct.pack("!Bf", T_FLOAT32, value)
+        return struct.pack("!Bd", T_FLOAT64, value)
+    # Cut at 65535 bytes, dropping a character the cut would split (decode would fail on it)
+    data = str(value).encode("utf-8")[:65535].decode("utf-8", "ignore").encode("utf-8")
+    return struct.pack("!BH", T_STR, len(data)) + data
+
+
+def _unpack_value(buf, pos):
+    tag = buf[pos]
+    pos += 1
+    if tag == T_ABSENT:
+        return _MISSING, pos
+    if tag == T_NONE:
+        return None, pos
+    if tag == T_TRUE:
+        return True, pos
+    if tag == T_FALSE:
+        return False, pos
+    if tag == T_INT8:
+        return struct.unpack_from("!b", buf, pos)[0], pos + 1
+    if tag == T_INT32:
+        return struct.unpack_from("!i", buf, pos)[0], pos + 4
+    if tag == T_FLOAT32:
+        value = struct.unpack_from("!f", buf, pos)[0]
+        return float(f"{value:.7g}"), pos + 4  # Drop float32 noise (18.7 -> 18.700000762)
+    if tag == T_FLOAT64:
+        return struct.unpack_from("!d", buf, pos)[0], pos + 8
+    if tag == T_STR:
+        (length,) = struct.unpack_from("!H", buf, pos)
+        pos += 2
+        if pos + length > len(buf):
+            raise WireError("String runs past the end of the frame")
+        return buf[pos:pos + length].decode("utf-8"), pos + length
+    raise WireError(f"Unknown value tag {tag}")
+
+
+class ReportEncoder:
+    """
+    Encodes consecutive reports of one host.
+    Sends a full keyframe first and every 'keyframe_interval' frames,
+    otherwise only the fields that changed.
+    """
+
+    def __init__(self, keyframe_interval=60):
+        self.keyframe_interval = keyframe_interval
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the previous report (e.g. after reconnecting): the next frame is a keyframe.
+        """
+        self.previous = None
+        self.seq = 0
+
+    def encode(self, report, timestamp=None):
+        """
+        Returns one length-prefixed frame (bytes).
+        """
+        flat = flatten(report)
+        full = self.previous is None or self.seq % self.keyframe_interval == 0
+
+        mask = 0
+        values = []
+        for i in range(len(FIELDS)):
+            value = flat.get(i, _MISSING)
+            if full:
+                if value is _MISSING:
+                    continue
+            else:
+                old = self.previous.get(i, _MISSING)
+                # 'is' check keeps True/1 and False/0 apart
+                if value is old or (type(value) is type(old) and value == old):
+                    continue
+            mask |= 1 << i
+            values.append(_pack_value(value))
+
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        payload = HEADER.pack(SCHEMA_VERSION, FULL if full else DELTA, self.seq & 0xFFFF,
+                              timestamp, mask) + b"".join(values)
+        self.previous = flat
+        self.seq += 1
+        return LENGTH.pack(len(payload)) + payload
+
+
+class ReportDecoder:
+    """
+    Rebuilds full reports from the frames of one connection.
+    """
+
+    def __init__(self):
+        self.state = None
+        self.expected_seq = None
+
+    def decode(self, payload):
+        """
+        payload - frame without the length prefix. Returns the full report dict.
+        Raises WireError for anything that is not a valid frame (truncated, corrupt).
+        """
+        try:
+            return self._decode(payload)
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise WireError(f"Malformed frame: {e}") from e
+
+    def _decode(self, payload):
+        version, kind, seq, timestamp, mask = HEADER.unpack_from(payload, 0)
+        if version != SCHEMA_VERSION:
+            raise WireError(f"Unsupported schema version {version}")
+        if kind == DELTA:
+            if self.state is None or seq != self.expected_seq:
+                raise WireError("Delta frame without a matching previous frame")
+            state = dict(self.state)
+        else:
+            state = {}
+
+        pos = HEADER.size
+        for i in range(len(FIELDS)):
+            if not mask >> i & 1:
+                continue
+            value, pos = _unpack_value(payload, pos)
+            if value is _MISSING:
+                state.pop(i, None)
+            else:
+                state[i] = value
+
+        self.state = state
+        self.expected_seq = (seq + 1) & 0xFFFF
+        return unflatten(state, timestamp)
+
+
+def read_frame(sock_file):
+    """
+    Read one frame payload from a binary file-like object (socket.makefile('rb')).
+    Returns None at end of stream. Raises WireError for a frame over MAX_FRAME
+    (nothing of it is read, the stream cannot be resynchronized after that).
+    """
+    header = sock_file.read(LENGTH.size)
+    if len(header) < LENGTH.size:
+        return None
+    (length,) = LENGTH.unpack(header)
+    if length > MAX_FRAME:
+        raise WireError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    payload = sock_file.read(length)
+    if len(payload) < length:
+        return None
+    return payload